@@ -1,44 +1,110 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, Response, g, has_app_context, send_file, stream_with_context
 from flask_cors import CORS
+import click
 import logging
 import sqlite3
 from datetime import datetime, timedelta
 import csv
+import hashlib
+import io
+import multiprocessing
 import os
+import queue
+import re
+import secrets
+import threading
+import time
+import zipfile
+import zlib
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import wraps
+from itertools import groupby
 from werkzeug.security import generate_password_hash, check_password_hash
+from xml.sax.saxutils import escape as xml_escape
+from itsdangerous import BadSignature, URLSafeSerializer
+import numpy as np
 import json
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
-app.secret_key = 'your_secret_key_change_in_production'
+DEFAULT_SECRET_KEY = 'your_secret_key_change_in_production'
+app.secret_key = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
 
 # Enable debug logging for diagnostics
 app.logger.setLevel(logging.DEBUG)
 
-# Session store using SQLite for persistence
-def init_sessions_db():
-    """Initialize sessions table"""
+# -------------------- DATABASE CONNECTIONS --------------------
+DATABASE = 'database.db'
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', '20000'))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))
+
+class PooledConnection(sqlite3.Connection):
+    """Connection shared by everything that runs during one request.
+
+    Handlers still call ``close()`` when they are done. For a pooled
+    connection that only discards uncommitted work, and the connection
+    itself goes back to the pool in ``release_db`` at teardown.
+    """
+
+    def close(self):
+        self.rollback()
+
+    def really_close(self):
+        super().close()
+
+def connect_db(factory=sqlite3.Connection):
+    """Open a connection in WAL mode with the tuned pragmas applied"""
+    conn = sqlite3.connect(DATABASE, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                           factory=factory, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers run while a roster save holds the write lock
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+# Idle connections of this worker process
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+# Helper function to get db connection
+def get_db():
+    """Return the request's connection, taking one from the pool on first use.
+
+    Outside a request (startup, CLI) a private connection is returned and
+    the caller is responsible for closing it.
+    """
+    if not has_app_context():
+        return connect_db()
+    if 'db' not in g:
+        try:
+            g.db = _db_pool.get_nowait()
+        except queue.Empty:
+            g.db = connect_db(factory=PooledConnection)
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop('db', None)
+    if conn is None:
+        return
     try:
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                token TEXT PRIMARY KEY,
-                username TEXT,
-                created_at TEXT,
-                last_accessed TEXT
-            )
-        ''')
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Error initializing sessions table: {e}")
+        conn.rollback()
+        _db_pool.put_nowait(conn)
+    except (sqlite3.Error, queue.Full):
+        conn.really_close()
 
+# Session store using SQLite for persistence
 def add_session(token, username):
     """Add session to database"""
     try:
-        conn = sqlite3.connect('database.db')
+        conn = get_db()
         cursor = conn.cursor()
         now = datetime.now().isoformat()
         cursor.execute('''
@@ -50,55 +116,229 @@ def add_session(token, username):
     except Exception as e:
         print(f"Error adding session: {e}")
 
-def get_session(token):
-    """Get session from database"""
-    try:
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT username FROM sessions WHERE token = ?', (token,))
-        result = cursor.fetchone()
-        conn.close()
-        return result
-    except Exception as e:
-        print(f"Error getting session: {e}")
-        return None
-
 def delete_session(token):
     """Delete session from database"""
     try:
-        conn = sqlite3.connect('database.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('DELETE FROM sessions WHERE token = ?', (token,))
         conn.commit()
         conn.close()
     except Exception as e:
         print(f"Error deleting session: {e}")
+    invalidate_auth_cache(token=token)
 
 def delete_sessions_for_username(username):
     """Delete all sessions for a given username"""
     try:
-        conn = sqlite3.connect('database.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('DELETE FROM sessions WHERE username = ?', (username,))
         conn.commit()
         conn.close()
     except Exception as e:
         print(f"Error deleting sessions for user {username}: {e}")
+    invalidate_auth_cache(username=username)
+
+# Session lifetime, in seconds. 0 disables the corresponding limit.
+SESSION_ABSOLUTE_TTL = int(os.getenv('SESSION_ABSOLUTE_TTL', str(7 * 24 * 3600)))
+SESSION_IDLE_TTL = int(os.getenv('SESSION_IDLE_TTL', str(12 * 3600)))
+# last_accessed is rewritten at most this often per session
+SESSION_TOUCH_INTERVAL = int(os.getenv('SESSION_TOUCH_INTERVAL', '300'))
+# How often each worker flushes touches and sweeps expired sessions
+SESSION_MAINTENANCE_INTERVAL = int(os.getenv('SESSION_MAINTENANCE_INTERVAL', '60'))
+SESSION_SWEEP_CHUNK = 500
+
+# token -> last access time waiting to be written by flush_session_touches
+_pending_touches = {}
+_pending_touches_lock = threading.Lock()
+
+def session_cutoffs(now=None):
+    """Return (created_at, last_accessed) timestamps a live session must exceed"""
+    now = now or datetime.now()
+    created_cutoff = (now - timedelta(seconds=SESSION_ABSOLUTE_TTL)).isoformat() if SESSION_ABSOLUTE_TTL > 0 else ''
+    idle_cutoff = (now - timedelta(seconds=SESSION_IDLE_TTL)).isoformat() if SESSION_IDLE_TTL > 0 else ''
+    return created_cutoff, idle_cutoff
+
+def touch_session(token, last_accessed):
+    """Queue a last_accessed update if the stored value is getting stale.
+
+    With the maintenance thread disabled the update is written inline.
+    """
+    now = datetime.now()
+    if last_accessed and last_accessed > (now - timedelta(seconds=SESSION_TOUCH_INTERVAL)).isoformat():
+        return
+    if SESSION_MAINTENANCE_INTERVAL <= 0:
+        # No maintenance thread would ever flush the queue; write it now
+        conn = get_db()
+        conn.execute('UPDATE sessions SET last_accessed = ? WHERE token = ?', (now.isoformat(), token))
+        conn.commit()
+        conn.close()
+        return
+    with _pending_touches_lock:
+        _pending_touches[token] = now.isoformat()
+
+def flush_session_touches(conn):
+    """Write queued last_accessed updates in one transaction"""
+    with _pending_touches_lock:
+        touches = list(_pending_touches.items())
+        _pending_touches.clear()
+    if not touches:
+        return 0
+    conn.executemany('UPDATE sessions SET last_accessed = ? WHERE token = ?',
+                     [(accessed, token) for token, accessed in touches])
+    conn.commit()
+    return len(touches)
+
+def sweep_expired_sessions(conn, chunk_size=SESSION_SWEEP_CHUNK, pause=0.05):
+    """Delete expired sessions in small transactions so writers are not held up"""
+    created_cutoff, idle_cutoff = session_cutoffs()
+    deleted = 0
+    while True:
+        cursor = conn.execute('''
+            DELETE FROM sessions WHERE token IN (
+                SELECT token FROM sessions
+                WHERE created_at < ? OR last_accessed < ?
+                LIMIT ?
+            )
+        ''', (created_cutoff, idle_cutoff, chunk_size))
+        conn.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < chunk_size:
+            return deleted
+        time.sleep(pause)
+
+def run_session_maintenance():
+    """Flush pending touches and sweep expired sessions once"""
+    conn = connect_db()
+    try:
+        flush_session_touches(conn)
+        conn.execute('DELETE FROM token_revocations WHERE expires_at < ?', (time.time(),))
+        conn.execute('DELETE FROM stream_tickets WHERE expires_at < ?', (time.time(),))
+        conn.commit()
+        return sweep_expired_sessions(conn)
+    finally:
+        conn.close()
 
-# Initialize sessions table
-init_sessions_db()
-
-# Initialize SQLite database
-def init_db():
-    conn = sqlite3.connect('database.db')
-    cursor = conn.cursor()
-
-    def add_column_if_missing(table, column, col_def):
-        cursor.execute(f"PRAGMA table_info({table})")
-        cols = [row[1] for row in cursor.fetchall()]
-        if column not in cols:
-            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col_def}")
-
+def _session_maintenance_loop():
+    while True:
+        time.sleep(SESSION_MAINTENANCE_INTERVAL)
+        try:
+            run_session_maintenance()
+        except Exception as e:
+            app.logger.error(f"Session maintenance failed: {e}")
+
+_maintenance_pid = None
+
+@app.before_request
+def start_session_maintenance():
+    """Start this worker's maintenance thread on its first request"""
+    global _maintenance_pid
+    if _maintenance_pid == os.getpid() or SESSION_MAINTENANCE_INTERVAL <= 0:
+        return
+    _maintenance_pid = os.getpid()
+    threading.Thread(target=_session_maintenance_loop, name='session-maintenance', daemon=True).start()
+
+@app.cli.command('sweep-sessions')
+def sweep_sessions_command():
+    """Delete expired sessions now."""
+    print(f"Deleted {run_session_maintenance()} expired sessions")
+
+# -------------------- SHIFT CATALOG --------------------
+# Roster cells store a shift_id and a status_code. The "<shift_name> (<shift_code>)"
+# and status texts the API exposes are derived from the shifts table when a
+# response is built, so renaming a shift is a single-row update. Text that
+# matches no shift or status is kept verbatim in shift_label/status_label.
+OFF_SHIFT_TEXT = 'N/A'
+STATUS_CODES = {'Full Day': 1, 'Half Day': 2, 'OFF': 3}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+STATUS_FULL_DAY = STATUS_CODES['Full Day']
+STATUS_HALF_DAY = STATUS_CODES['Half Day']
+STATUS_OFF = STATUS_CODES['OFF']
+
+_SHIFT_CODE_SUFFIX = re.compile(r'\(([^()]*)\)\s*$')
+
+def shift_display(shift_name, shift_code):
+    return f"{shift_name} ({shift_code})"
+
+class ShiftCatalog:
+    """Shift metadata loaded once per response for encoding and decoding cells"""
+
+    def __init__(self, rows):
+        self.displays = {}
+        self.codes = {}
+        self.types = {}
+        self.ids_by_display = {}
+        self.ids_by_code = {}
+        for shift_id, shift_name, shift_code, shift_type in rows:
+            display = shift_display(shift_name, shift_code)
+            self.displays[shift_id] = display
+            self.codes[shift_id] = shift_code
+            self.types[shift_id] = shift_type
+            self.ids_by_display.setdefault(display, shift_id)
+            self.ids_by_code.setdefault(str(shift_code), shift_id)
+
+    @classmethod
+    def load(cls, cursor):
+        cursor.execute('SELECT id, shift_name, shift_code, type FROM shifts')
+        return cls(tuple(row) for row in cursor.fetchall())
+
+    def resolve_id(self, shift_id):
+        """Return shift_id as an int if such a shift exists, else None"""
+        try:
+            shift_id = int(shift_id)
+        except (TypeError, ValueError):
+            return None
+        return shift_id if shift_id in self.displays else None
+
+    def encode(self, text):
+        """Turn a display string into (shift_id, shift_label)"""
+        if text is None or text == OFF_SHIFT_TEXT:
+            return None, None
+        if not isinstance(text, str):
+            # JSON numbers and the like are kept as free text
+            return None, str(text)
+        if text in self.ids_by_display:
+            return self.ids_by_display[text], None
+        # Renamed shifts still carry their code in parentheses
+        match = _SHIFT_CODE_SUFFIX.search(text)
+        if match and match.group(1) in self.ids_by_code:
+            return self.ids_by_code[match.group(1)], None
+        return None, text
+
+    def display(self, shift_id, shift_label=None):
+        if shift_label is not None:
+            return shift_label
+        if shift_id is None:
+            return OFF_SHIFT_TEXT
+        return self.displays.get(shift_id, '')
+
+    def code(self, shift_id):
+        return self.codes.get(shift_id, '') if shift_id is not None else ''
+
+def encode_status(status):
+    """Turn a status text into (status_code, status_label)"""
+    if not isinstance(status, str):
+        return None, None if status is None else str(status)
+    if status in STATUS_CODES:
+        return STATUS_CODES[status], None
+    return None, status
+
+def decode_status(status_code, status_label=None):
+    return STATUS_NAMES.get(status_code, status_label)
+
+# -------------------- SCHEMA MIGRATIONS --------------------
+# Migrations run once each, in order. PRAGMA user_version holds the last
+# applied version and schema_migrations records when each one was applied.
+
+def add_column_if_missing(cursor, table, column, col_def):
+    cursor.execute(f"PRAGMA table_info({table})")
+    cols = [row[1] for row in cursor.fetchall()]
+    if column not in cols:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col_def}")
+
+def migration_base_schema(cursor):
+    """Tables as they existed before versioned migrations"""
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS employees (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -162,23 +402,672 @@ def init_db():
         )
     ''')
 
-    conn.commit()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            token TEXT PRIMARY KEY,
+            username TEXT,
+            created_at TEXT,
+            last_accessed TEXT
+        )
+    ''')
 
-    # Migrate columns if missing
-    add_column_if_missing('employees', 'team_id', 'team_id INTEGER')
-    add_column_if_missing('roster', 'team_id', 'team_id INTEGER')
+    # Columns added after the first release
+    add_column_if_missing(cursor, 'employees', 'team_id', 'team_id INTEGER')
+    add_column_if_missing(cursor, 'roster', 'team_id', 'team_id INTEGER')
+
+def migration_lookup_indexes(cursor):
+    """Indexes for the team/date/employee lookups on every request"""
+    # Team-month views and range scans: WHERE team_id = ? AND date ...
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_roster_team_date_emp ON roster (team_id, date, emp_id)')
+    # Per-employee history: WHERE team_id = ? AND emp_id = ? AND date ...
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_roster_team_emp_date ON roster (team_id, emp_id, date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_team_name ON employees (team_id, name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_team_emp ON employees (team_id, emp_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_username ON sessions (username)')
+
+def migration_session_expiry_indexes(cursor):
+    """Let the session sweeper find expired rows without a full scan"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions (created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_last_accessed ON sessions (last_accessed)')
+
+def migration_token_revocations(cursor):
+    """Revoked signed tokens, kept until the tokens would have expired anyway"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS token_revocations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE,
+            revoked_at REAL,
+            expires_at REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_token_revocations_expires_at ON token_revocations (expires_at)')
+
+def migration_roster_shift_ids(cursor):
+    """Store roster cells as shift_id/status_code instead of display strings"""
+    cursor.execute('ALTER TABLE roster ADD COLUMN shift_id INTEGER REFERENCES shifts (id)')
+    cursor.execute('ALTER TABLE roster ADD COLUMN status_code INTEGER')
+    cursor.execute('ALTER TABLE roster ADD COLUMN shift_label TEXT')
+    cursor.execute('ALTER TABLE roster ADD COLUMN status_label TEXT')
+
+    # Parse each distinct display string once, then backfill set-based
+    cursor.execute('SELECT id, shift_name, shift_code, type FROM shifts')
+    catalog = ShiftCatalog(cursor.fetchall())
+    cursor.execute('SELECT DISTINCT shift FROM roster WHERE shift IS NOT NULL')
+    mapping = [(text,) + catalog.encode(text) for (text,) in cursor.fetchall()]
+    cursor.execute('CREATE TEMP TABLE roster_shift_map (shift TEXT PRIMARY KEY, shift_id INTEGER, shift_label TEXT)')
+    cursor.executemany('INSERT INTO roster_shift_map VALUES (?, ?, ?)', mapping)
+    cursor.execute('''
+        UPDATE roster SET
+            shift_id = (SELECT m.shift_id FROM roster_shift_map m WHERE m.shift = roster.shift),
+            shift_label = (SELECT m.shift_label FROM roster_shift_map m WHERE m.shift = roster.shift)
+    ''')
+    cursor.execute('DROP TABLE roster_shift_map')
 
-    conn.commit()
-    conn.close()
+    cursor.execute('''
+        UPDATE roster SET
+            status_code = CASE status WHEN 'Full Day' THEN 1 WHEN 'Half Day' THEN 2 WHEN 'OFF' THEN 3 END,
+            status_label = CASE WHEN status IN ('Full Day', 'Half Day', 'OFF') THEN NULL ELSE status END
+    ''')
+
+    try:
+        cursor.execute('ALTER TABLE roster DROP COLUMN shift')
+        cursor.execute('ALTER TABLE roster DROP COLUMN status')
+    except sqlite3.OperationalError:
+        # SQLite < 3.35 cannot drop columns; leave them empty instead
+        cursor.execute('UPDATE roster SET shift = NULL, status = NULL')
+
+    # Display-string view for code that reads roster text directly (app.py)
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS roster_cells AS
+        SELECT r.id, r.emp_id, r.date, r.team_id, r.shift_id, r.status_code,
+               CASE
+                   WHEN r.shift_label IS NOT NULL THEN r.shift_label
+                   WHEN r.shift_id IS NULL THEN 'N/A'
+                   ELSE s.shift_name || ' (' || s.shift_code || ')'
+               END AS shift,
+               CASE r.status_code
+                   WHEN 1 THEN 'Full Day' WHEN 2 THEN 'Half Day' WHEN 3 THEN 'OFF'
+                   ELSE r.status_label
+               END AS status
+        FROM roster r
+        LEFT JOIN shifts s ON s.id = r.shift_id
+    ''')
+
+def migration_roster_employee_ids(cursor):
+    """Reference employees.id from roster instead of the mutable emp_id text"""
+    cursor.execute('ALTER TABLE roster ADD COLUMN employee_id INTEGER REFERENCES employees (id)')
+    # Legacy rows without a team belong to whichever employee has that emp_id
+    cursor.execute('''
+        UPDATE roster SET employee_id = (
+            SELECT e.id FROM employees e
+            WHERE e.emp_id = roster.emp_id AND (e.team_id = roster.team_id OR roster.team_id IS NULL)
+            ORDER BY e.id LIMIT 1
+        )
+    ''')
+
+    # Rows whose employee no longer exists were never shown; keep them aside
+    # with their emp_id rather than losing who they belonged to
+    cursor.execute('CREATE TABLE IF NOT EXISTS roster_orphans AS SELECT * FROM roster WHERE 0')
+    cursor.execute('INSERT INTO roster_orphans SELECT * FROM roster WHERE employee_id IS NULL')
+    cursor.execute('DELETE FROM roster WHERE employee_id IS NULL')
+
+    # The view and indexes on emp_id have to go before the column can
+    cursor.execute('DROP VIEW IF EXISTS roster_cells')
+    cursor.execute('DROP INDEX IF EXISTS idx_roster_team_date_emp')
+    cursor.execute('DROP INDEX IF EXISTS idx_roster_team_emp_date')
+    try:
+        cursor.execute('ALTER TABLE roster DROP COLUMN emp_id')
+    except sqlite3.OperationalError:
+        cursor.execute('UPDATE roster SET emp_id = NULL')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_roster_team_date_employee ON roster (team_id, date, employee_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_roster_employee_date ON roster (employee_id, date)')
+
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS roster_cells AS
+        SELECT r.id, r.employee_id, e.emp_id, r.date, r.team_id, r.shift_id, r.status_code,
+               CASE
+                   WHEN r.shift_label IS NOT NULL THEN r.shift_label
+                   WHEN r.shift_id IS NULL THEN 'N/A'
+                   ELSE s.shift_name || ' (' || s.shift_code || ')'
+               END AS shift,
+               CASE r.status_code
+                   WHEN 1 THEN 'Full Day' WHEN 2 THEN 'Half Day' WHEN 3 THEN 'OFF'
+                   ELSE r.status_label
+               END AS status
+        FROM roster r
+        JOIN employees e ON e.id = r.employee_id
+        LEFT JOIN shifts s ON s.id = r.shift_id
+    ''')
+
+# Rows deleted per transaction when collapsing duplicate roster cells
+ROSTER_DEDUP_CHUNK = 500
+
+def migration_roster_unique_cells(cursor):
+    """Collapse duplicate roster cells and enforce one row per employee and day.
+
+    Each batch of deletes is committed on its own, so the write lock is
+    released between batches instead of being held for the whole cleanup.
+    Deleting a duplicate is safe to repeat: if the process stops half way,
+    the version is not bumped and the next start finds what is left.
+    """
+    # Keep the row the read paths already showed: a team row over a teamless
+    # one, then the oldest
+    cursor.execute('''
+        CREATE TEMP TABLE roster_duplicates AS
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY employee_id, date ORDER BY team_id IS NULL, id
+            ) AS rn
+            FROM roster
+            WHERE employee_id IS NOT NULL
+        )
+        WHERE rn > 1
+    ''')
+    while True:
+        cursor.execute('''
+            SELECT rowid, id FROM roster_duplicates ORDER BY rowid LIMIT ?
+        ''', (ROSTER_DEDUP_CHUNK,))
+        batch = cursor.fetchall()
+        if not batch:
+            break
+        cursor.executemany('DELETE FROM roster WHERE id = ?', [(row_id,) for _, row_id in batch])
+        cursor.execute('DELETE FROM roster_duplicates WHERE rowid <= ?', (batch[-1][0],))
+        cursor.execute('COMMIT')
+        cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('DROP TABLE roster_duplicates')
+
+    cursor.execute('DROP INDEX IF EXISTS idx_roster_employee_date')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_roster_employee_date ON roster (employee_id, date)')
+
+# data_versions scopes: one per team for its roster and employees, and one
+# for the shift catalog that every roster is rendered with
+SHIFTS_SCOPE = 'shifts'
+
+def team_scope(team_id):
+    return f'team:{team_id}'
+
+def version_bump_sql(scope, when='1'):
+    """Trigger statement that bumps the data_versions row of ``scope`` (an SQL expression)"""
+    return f'''
+        INSERT INTO data_versions (scope, version) SELECT {scope}, 1 WHERE {when}
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+    '''
+
+def migration_data_versions(cursor):
+    """Version counters that triggers bump whenever roster-visible data changes"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+
+    # Triggers rather than calls in each endpoint, so app.py and manual
+    # edits bump the version as well
+    bump = version_bump_sql
+
+    for table in ('roster', 'employees'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_version_insert AFTER INSERT ON {table} BEGIN
+                {bump("'team:' || NEW.team_id", 'NEW.team_id IS NOT NULL')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_version_update AFTER UPDATE ON {table} BEGIN
+                {bump("'team:' || NEW.team_id", 'NEW.team_id IS NOT NULL')}
+                {bump("'team:' || OLD.team_id", 'OLD.team_id IS NOT NULL AND OLD.team_id IS NOT NEW.team_id')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_version_delete AFTER DELETE ON {table} BEGIN
+                {bump("'team:' || OLD.team_id", 'OLD.team_id IS NOT NULL')}
+            END
+        ''')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS shifts_version_{event.lower()} AFTER {event} ON shifts BEGIN
+                {bump(f"'{SHIFTS_SCOPE}'")}
+            END
+        ''')
+
+# Change log entries kept per team; older ones are dropped as new ones arrive
+ROSTER_CHANGE_LOG_SIZE = 10000
+
+def migration_roster_change_log(cursor):
+    """Log every team version bump with the roster cell it was for"""
+    # One row per team version. date is NULL for changes to the employee
+    # itself (add, rename, delete), which a cell-level delta cannot express.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS roster_changes (
+            team_id INTEGER,
+            version INTEGER,
+            employee_id INTEGER,
+            date TEXT,
+            changed_at TEXT,
+            PRIMARY KEY (team_id, version)
+        )
+    ''')
+
+    def log_change(team, employee_id, date, when):
+        scope = f"'team:' || {team}"
+        return f'''
+            INSERT INTO data_versions (scope, version) SELECT {scope}, 1 WHERE {when}
+            ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+            INSERT INTO roster_changes (team_id, version, employee_id, date, changed_at)
+            SELECT {team}, version, {employee_id}, {date}, strftime('%Y-%m-%dT%H:%M:%f', 'now')
+            FROM data_versions WHERE scope = {scope} AND {when};
+            DELETE FROM roster_changes
+            WHERE team_id = {team} AND {when} AND version <= (
+                SELECT version FROM data_versions WHERE scope = {scope}
+            ) - {ROSTER_CHANGE_LOG_SIZE};
+        '''
+
+    # Replaces the plain version bumps of migration 8 for roster and employees
+    cell_moved = 'OLD.team_id IS NOT NEW.team_id OR OLD.employee_id IS NOT NEW.employee_id OR OLD.date IS NOT NEW.date'
+    triggers = {
+        'roster': (
+            log_change('NEW.team_id', 'NEW.employee_id', 'NEW.date', 'NEW.team_id IS NOT NULL'),
+            log_change('NEW.team_id', 'NEW.employee_id', 'NEW.date', 'NEW.team_id IS NOT NULL')
+            + log_change('OLD.team_id', 'OLD.employee_id', 'OLD.date', f'OLD.team_id IS NOT NULL AND ({cell_moved})'),
+            log_change('OLD.team_id', 'OLD.employee_id', 'OLD.date', 'OLD.team_id IS NOT NULL'),
+        ),
+        'employees': (
+            log_change('NEW.team_id', 'NEW.id', 'NULL', 'NEW.team_id IS NOT NULL'),
+            log_change('NEW.team_id', 'NEW.id', 'NULL', 'NEW.team_id IS NOT NULL')
+            + log_change('OLD.team_id', 'OLD.id', 'NULL', 'OLD.team_id IS NOT NULL AND OLD.team_id IS NOT NEW.team_id'),
+            log_change('OLD.team_id', 'OLD.id', 'NULL', 'OLD.team_id IS NOT NULL'),
+        ),
+    }
+    for table, bodies in triggers.items():
+        for event, body in zip(('insert', 'update', 'delete'), bodies):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {table}_version_{event}')
+            cursor.execute(f'''
+                CREATE TRIGGER {table}_version_{event} AFTER {event.upper()} ON {table} BEGIN
+                    {body}
+                END
+            ''')
+
+TEAMS_SCOPE = 'teams'
+SETTINGS_SCOPE = 'settings'
+
+def migration_reference_versions(cursor):
+    """Version counters for the teams and settings tables"""
+    for table, scope in (('teams', TEAMS_SCOPE), ('settings', SETTINGS_SCOPE)):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                    {version_bump_sql(f"'{scope}'")}
+                END
+            ''')
+
+# Summary tables behind /api/stats, kept current by triggers on roster and
+# employees. Rows without a team are counted under team_id 0 (team ids
+# start at 1), so the totals still cover every employee.
+STATS_TABLES = (
+    # (table, key columns, value columns, query that recomputes the rows)
+    ('team_stats', ('team_id',), ('employee_count', 'rostered_count'), '''
+        SELECT team_id, SUM(employee_count), SUM(rostered_count) FROM (
+            SELECT IFNULL(team_id, 0) AS team_id, COUNT(*) AS employee_count, 0 AS rostered_count
+            FROM employees GROUP BY 1
+            UNION ALL
+            SELECT IFNULL(team_id, 0), 0, COUNT(DISTINCT employee_id)
+            FROM roster WHERE employee_id IS NOT NULL GROUP BY 1
+        ) GROUP BY team_id
+    '''),
+    ('roster_employee_cells', ('team_id', 'employee_id'), ('cells',), '''
+        SELECT IFNULL(team_id, 0), employee_id, COUNT(*)
+        FROM roster WHERE employee_id IS NOT NULL GROUP BY 1, 2
+    '''),
+    ('roster_month_status', ('team_id', 'month', 'status_code'), ('cells',), '''
+        SELECT IFNULL(team_id, 0), substr(date, 1, 7), IFNULL(status_code, 0), COUNT(*)
+        FROM roster GROUP BY 1, 2, 3
+    '''),
+)
+
+def rebuild_stats(cursor):
+    """Recompute every summary table from roster and employees"""
+    for table, keys, values, query in STATS_TABLES:
+        cursor.execute(f'DELETE FROM {table}')
+        cursor.execute(f'INSERT INTO {table} ({", ".join(keys + values)}) {query}')
+
+def check_stats(cursor):
+    """Compare the summary tables with a fresh count; returns one message per mismatch"""
+    problems = []
+    for table, keys, values, query in STATS_TABLES:
+        # All-zero rows are left behind by decrements and count as missing
+        cursor.execute(f'SELECT {", ".join(keys + values)} FROM {table} WHERE {" OR ".join(values)}')
+        stored = {tuple(row[:len(keys)]): tuple(row[len(keys):]) for row in cursor.fetchall()}
+        cursor.execute(query)
+        expected = {tuple(row[:len(keys)]): tuple(row[len(keys):]) for row in cursor.fetchall()}
+        for key in sorted(stored.keys() | expected.keys(), key=repr):
+            if stored.get(key) != expected.get(key):
+                problems.append(f"{table} {dict(zip(keys, key))}: stored {stored.get(key)}, expected {expected.get(key)}")
+    return problems
+
+def stats_cell_sql(row, delta):
+    """Trigger statements that add (delta 1) or remove (delta -1) roster row ``row`` from the counts"""
+    team = f'IFNULL({row}.team_id, 0)'
+    employee = f'{row}.employee_id'
+    # The employee becomes rostered with its first cell in the team and stops with its last
+    edge = 1 if delta > 0 else 0
+    return f'''
+        INSERT INTO roster_month_status (team_id, month, status_code, cells)
+        VALUES ({team}, substr({row}.date, 1, 7), IFNULL({row}.status_code, 0), {delta})
+        ON CONFLICT (team_id, month, status_code) DO UPDATE SET cells = cells + {delta};
+        DELETE FROM roster_month_status WHERE team_id = {team} AND month = substr({row}.date, 1, 7)
+            AND status_code = IFNULL({row}.status_code, 0) AND cells = 0;
+        INSERT INTO roster_employee_cells (team_id, employee_id, cells)
+        SELECT {team}, {employee}, {delta} WHERE {employee} IS NOT NULL
+        ON CONFLICT (team_id, employee_id) DO UPDATE SET cells = cells + {delta};
+        INSERT INTO team_stats (team_id) VALUES ({team}) ON CONFLICT (team_id) DO NOTHING;
+        UPDATE team_stats SET rostered_count = rostered_count + {delta}
+        WHERE team_id = {team} AND (
+            SELECT cells FROM roster_employee_cells WHERE team_id = {team} AND employee_id = {employee}
+        ) = {edge};
+        DELETE FROM roster_employee_cells WHERE team_id = {team} AND employee_id = {employee} AND cells = 0;
+    '''
+
+def stats_employee_sql(row, delta):
+    """Trigger statements that add or remove employee ``row`` from its team's count"""
+    team = f'IFNULL({row}.team_id, 0)'
+    return f'''
+        INSERT INTO team_stats (team_id, employee_count) VALUES ({team}, {delta})
+        ON CONFLICT (team_id) DO UPDATE SET employee_count = employee_count + {delta};
+    '''
+
+def migration_stats_summary(cursor):
+    """Summary tables for /api/stats, maintained by triggers"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS team_stats (
+            team_id INTEGER PRIMARY KEY,
+            employee_count INTEGER NOT NULL DEFAULT 0,
+            rostered_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS roster_employee_cells (
+            team_id INTEGER,
+            employee_id INTEGER,
+            cells INTEGER NOT NULL,
+            PRIMARY KEY (team_id, employee_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS roster_month_status (
+            team_id INTEGER,
+            month TEXT,
+            status_code INTEGER,
+            cells INTEGER NOT NULL,
+            PRIMARY KEY (team_id, month, status_code)
+        ) WITHOUT ROWID
+    ''')
+
+    create_stats_triggers(cursor)
+    rebuild_stats(cursor)
+
+def create_stats_triggers(cursor):
+    """(Re)create the triggers that keep the stats summary tables current"""
+    cell_changed = ('OLD.team_id IS NOT NEW.team_id OR OLD.employee_id IS NOT NEW.employee_id '
+                    'OR OLD.date IS NOT NEW.date OR OLD.status_code IS NOT NEW.status_code')
+    triggers = {
+        'roster': (
+            ('', stats_cell_sql('NEW', 1)),
+            (cell_changed, stats_cell_sql('OLD', -1) + stats_cell_sql('NEW', 1)),
+            ('', stats_cell_sql('OLD', -1)),
+        ),
+        'employees': (
+            ('', stats_employee_sql('NEW', 1)),
+            ('OLD.team_id IS NOT NEW.team_id', stats_employee_sql('OLD', -1) + stats_employee_sql('NEW', 1)),
+            ('', stats_employee_sql('OLD', -1)),
+        ),
+    }
+    for table, bodies in triggers.items():
+        for event, (when, body) in zip(('insert', 'update', 'delete'), bodies):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {table}_stats_{event}')
+            cursor.execute(f'''
+                CREATE TRIGGER {table}_stats_{event} AFTER {event.upper()} ON {table}
+                {f'WHEN {when}' if when else ''} BEGIN
+                    {body}
+                END
+            ''')
+
+# Each roster row write fires the stats triggers as well as the version and
+# change-log ones; on 27,000 upserts they take about 0.4 s on insert and 1 s
+# on update. Bulk writes of at least STATS_DEFER_MIN_ROWS cells drop the
+# roster stats triggers inside their transaction and apply the difference
+# in the written employees' counts once at the end instead.
+STATS_DEFER_MIN_ROWS = 500
+
+def employee_roster_counts(cursor, employee_ids):
+    """Cells of ``employee_ids`` per (team_id, employee_id, month, status_code)"""
+    cursor.execute('''
+        SELECT IFNULL(team_id, 0), employee_id, substr(date, 1, 7), IFNULL(status_code, 0), COUNT(*)
+        FROM roster WHERE employee_id IN (SELECT value FROM json_each(?))
+        GROUP BY 1, 2, 3, 4
+    ''', (json.dumps(sorted(employee_ids)),))
+    return {tuple(row[:4]): row[4] for row in cursor.fetchall()}
+
+def apply_roster_count_changes(cursor, before, after):
+    """Move the summary tables from ``before`` to ``after`` employee_roster_counts"""
+    month_cells, employee_cells = Counter(), Counter()
+    old_totals, new_totals = Counter(), Counter()
+    for key, cells in before.items():
+        old_totals[key[:2]] += cells
+    for key, cells in after.items():
+        new_totals[key[:2]] += cells
+    for key in before.keys() | after.keys():
+        delta = after.get(key, 0) - before.get(key, 0)
+        team_id, employee_id, month, status_code = key
+        month_cells[team_id, month, status_code] += delta
+        employee_cells[team_id, employee_id] += delta
+    rostered = Counter()
+    for team_id, employee_id in old_totals.keys() | new_totals.keys():
+        rostered[team_id] += (new_totals[team_id, employee_id] > 0) - (old_totals[team_id, employee_id] > 0)
+
+    month_cells = [key + (delta,) for key, delta in month_cells.items() if delta]
+    cursor.executemany('''
+        INSERT INTO roster_month_status (team_id, month, status_code, cells) VALUES (?, ?, ?, ?)
+        ON CONFLICT (team_id, month, status_code) DO UPDATE SET cells = cells + excluded.cells
+    ''', month_cells)
+    cursor.executemany('''
+        DELETE FROM roster_month_status WHERE team_id = ? AND month = ? AND status_code = ? AND cells = 0
+    ''', [key[:3] for key in month_cells])
+    employee_cells = [key + (delta,) for key, delta in employee_cells.items() if delta]
+    cursor.executemany('''
+        INSERT INTO roster_employee_cells (team_id, employee_id, cells) VALUES (?, ?, ?)
+        ON CONFLICT (team_id, employee_id) DO UPDATE SET cells = cells + excluded.cells
+    ''', employee_cells)
+    cursor.executemany('DELETE FROM roster_employee_cells WHERE team_id = ? AND employee_id = ? AND cells = 0',
+                       [key[:2] for key in employee_cells])
+    rostered = [(team_id, delta) for team_id, delta in rostered.items() if delta]
+    cursor.executemany('''
+        INSERT INTO team_stats (team_id, rostered_count) VALUES (?, ?)
+        ON CONFLICT (team_id) DO UPDATE SET rostered_count = rostered_count + excluded.rostered_count
+    ''', rostered)
+
+@contextmanager
+def deferred_roster_stats(conn, employee_ids, rows):
+    """Write ``rows`` roster cells of ``employee_ids`` without the per-row stats triggers.
+
+    Below STATS_DEFER_MIN_ROWS this does nothing. Otherwise the triggers are
+    dropped in the caller's transaction and recreated, with the counts
+    brought up to date, before the block ends; other connections never see
+    them missing. On an error the caller's rollback restores them.
+    """
+    if rows < STATS_DEFER_MIN_ROWS:
+        yield
+        return
+    cursor = conn.cursor()
+    if not conn.in_transaction:
+        # DDL does not open a transaction by itself
+        cursor.execute('BEGIN IMMEDIATE')
+    before = employee_roster_counts(cursor, employee_ids)
+    for event in ('insert', 'update', 'delete'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS roster_stats_{event}')
+    yield
+    apply_roster_count_changes(cursor, before, employee_roster_counts(cursor, employee_ids))
+    create_stats_triggers(cursor)
+
+def migration_export_jobs(cursor):
+    """Background roster export jobs"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS export_jobs (
+            id TEXT PRIMARY KEY,
+            team_id INTEGER,
+            filter TEXT,
+            artifact TEXT,
+            status TEXT CHECK(status IN ('queued', 'running', 'done', 'failed')),
+            rows INTEGER,
+            error TEXT,
+            created_by TEXT,
+            created_at TEXT,
+            finished_at TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_export_jobs_artifact ON export_jobs (artifact, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_export_jobs_created_at ON export_jobs (created_at)')
+
+def migration_stream_tickets(cursor):
+    """Single-use tickets that let an EventSource open the roster stream"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stream_tickets (
+            ticket TEXT PRIMARY KEY,
+            token TEXT,
+            expires_at REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_stream_tickets_expires_at ON stream_tickets (expires_at)')
+
+MIGRATIONS = [
+    (1, 'base_schema', migration_base_schema),
+    (2, 'lookup_indexes', migration_lookup_indexes),
+    (3, 'session_expiry_indexes', migration_session_expiry_indexes),
+    (4, 'token_revocations', migration_token_revocations),
+    (5, 'roster_shift_ids', migration_roster_shift_ids),
+    (6, 'roster_employee_ids', migration_roster_employee_ids),
+    (7, 'roster_unique_cells', migration_roster_unique_cells),
+    (8, 'data_versions', migration_data_versions),
+    (9, 'roster_change_log', migration_roster_change_log),
+    (10, 'reference_versions', migration_reference_versions),
+    (11, 'stats_summary', migration_stats_summary),
+    (12, 'export_jobs', migration_export_jobs),
+    (13, 'stream_tickets', migration_stream_tickets),
+]
+
+def run_migrations(db_path=DATABASE):
+    """Apply pending migrations, each in its own IMMEDIATE transaction.
+
+    The version is re-read inside the transaction, so several workers
+    starting at once apply every migration exactly once. A migration that
+    commits part of its work early (migration_roster_unique_cells) must
+    keep that part safe to repeat.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied_at TEXT
+        )
+    ''')
+    try:
+        for version, name, migrate in MIGRATIONS:
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                current = cursor.execute('PRAGMA user_version').fetchone()[0]
+                if version > current:
+                    migrate(cursor)
+                    cursor.execute('INSERT OR REPLACE INTO schema_migrations (version, name, applied_at) VALUES (?,?,?)',
+                                   (version, name, datetime.now().isoformat()))
+                    cursor.execute(f'PRAGMA user_version = {int(version)}')
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+    finally:
+        conn.close()
+
+run_migrations()
+
+# -------------------- REFERENCE DATA CACHE --------------------
+# Shifts, teams and settings are read on almost every page and change a few
+# times a month. Each worker caches them next to the data_versions counter
+# they were loaded at. A private connection checks PRAGMA data_version,
+# which only moves when some connection commits, so while nothing is written
+# a cache hit costs no query; after any commit one read of data_versions
+# tells which tables actually changed.
+
+_reference_lock = threading.Lock()
+_reference_conn = None
+_reference_pid = None
+_reference_data_version = None
+_reference_versions = {}
+_reference_cache = {}  # name -> (version, value)
+
+def _reference_connection():
+    """This worker's private connection; call with _reference_lock held"""
+    global _reference_conn, _reference_pid, _reference_data_version
+    if _reference_pid != os.getpid():
+        # Connections must not be shared across a fork
+        _reference_conn = connect_db()
+        _reference_pid = os.getpid()
+        _reference_data_version = None
+    return _reference_conn
+
+def reference_versions():
+    """Current versions of the reference-data scopes"""
+    global _reference_data_version, _reference_versions
+    with _reference_lock:
+        conn = _reference_connection()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != _reference_data_version:
+            rows = conn.execute('SELECT scope, version FROM data_versions WHERE scope IN (?, ?, ?)',
+                                (SHIFTS_SCOPE, TEAMS_SCOPE, SETTINGS_SCOPE)).fetchall()
+            _reference_versions = {row['scope']: row['version'] for row in rows}
+            _reference_data_version = data_version
+        return _reference_versions
+
+def cached_reference(name, scope, load):
+    """Return ``load(cursor)``, reusing the cached value while ``scope`` is unchanged.
+
+    Misses load through the private connection, in one read transaction
+    with the version they are cached under. A caller's connection may hold
+    an older snapshot and must not be used. Cached values are shared
+    between requests and must not be modified.
+    """
+    version = reference_versions().get(scope, 0)
+    with _reference_lock:
+        entry = _reference_cache.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        conn = _reference_connection()
+        conn.execute('BEGIN')
+        try:
+            row = conn.execute('SELECT version FROM data_versions WHERE scope = ?', (scope,)).fetchone()
+            value = load(conn.cursor())
+        finally:
+            conn.rollback()
+        _reference_cache[name] = (row['version'] if row else 0, value)
+        return value
+
+def get_shift_catalog():
+    return cached_reference('shift_catalog', SHIFTS_SCOPE, ShiftCatalog.load)
+
+def load_shifts(cursor):
+    cursor.execute('SELECT * FROM shifts ORDER BY shift_name')
+    return [dict(row) for row in cursor.fetchall()]
+
+def load_teams(cursor):
+    cursor.execute('SELECT id, name, description, created_at FROM teams ORDER BY name')
+    return [dict(row) for row in cursor.fetchall()]
 
-init_db()
+def load_settings(cursor):
+    cursor.execute('SELECT key, value FROM settings')
+    return {row['key']: row['value'] for row in cursor.fetchall()}
 
 # -------------------- BOOTSTRAP DATA --------------------
-# Helper function to get db connection
-def get_db():
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def seed_initial_data():
     conn = get_db()
@@ -233,37 +1122,221 @@ def seed_initial_data():
 
 seed_initial_data()
 
+# -------------------- AUTH RESOLUTION --------------------
+# token -> (expires_at, user) for recently seen tokens of this worker.
+# Entries are dropped on logout, user deletion and user updates; the TTL
+# bounds how long another worker may keep serving a revoked token.
+AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL', '15'))
+AUTH_CACHE_MAX = 4096
+_auth_cache = {}
+_auth_cache_lock = threading.Lock()
+
+def invalidate_auth_cache(token=None, username=None):
+    """Forget cached users for a token, for every token of a username, or all"""
+    with _auth_cache_lock:
+        if token is None and username is None:
+            _auth_cache.clear()
+        if token is not None:
+            _auth_cache.pop(token, None)
+        if username is not None:
+            for key in [k for k, (_, u) in _auth_cache.items() if u['username'] == username]:
+                del _auth_cache[key]
+
+# -------------------- SIGNED TOKENS --------------------
+# With AUTH_TOKEN_MODE=signed, login issues HMAC-signed tokens carrying the
+# user's claims, so requests authenticate without touching the database.
+# Logout and user changes add entries to token_revocations; each worker
+# mirrors that table in memory and picks up new rows every few seconds.
+AUTH_TOKEN_MODE = os.getenv('AUTH_TOKEN_MODE', 'session')  # 'session' or 'signed'
+SIGNED_TOKEN_PREFIX = 'rms1.'
+SIGNED_TOKEN_TTL = int(os.getenv('SIGNED_TOKEN_TTL', str(SESSION_ABSOLUTE_TTL or 7 * 24 * 3600)))
+TOKEN_REVOCATION_REFRESH = float(os.getenv('TOKEN_REVOCATION_REFRESH', '5'))
+
+# Anyone who knows the key can mint tokens for any role, so the key that
+# ships in this file must never sign them
+if AUTH_TOKEN_MODE == 'signed' and app.secret_key in (None, '', DEFAULT_SECRET_KEY):
+    raise RuntimeError('AUTH_TOKEN_MODE=signed requires SECRET_KEY to be set to a private value')
+
+_token_serializer = URLSafeSerializer(app.secret_key, salt='rms-auth-token',
+                                      signer_kwargs={'digest_method': hashlib.sha256})
+
+# revocation key -> (revoked_at, expires_at); keys are a token id or "user:<username>"
+_revocations = {}
+_revocations_lock = threading.Lock()
+_revocations_state = {'last_id': 0, 'checked_at': 0.0}
+
+def issue_signed_token(user):
+    now = time.time()
+    claims = {
+        'jti': secrets.token_urlsafe(12),
+        'uid': user['id'],
+        'sub': user['username'],
+        'role': user['role'],
+        'team_id': user['team_id'],
+        'iat': now,
+        'exp': now + SIGNED_TOKEN_TTL,
+    }
+    return SIGNED_TOKEN_PREFIX + _token_serializer.dumps(claims)
+
+def decode_signed_token(token):
+    """Return the claims of a signed token if its signature and expiry are valid.
+
+    Signed tokens are only honoured in signed mode.
+    """
+    if AUTH_TOKEN_MODE != 'signed' or not token.startswith(SIGNED_TOKEN_PREFIX):
+        return None
+    try:
+        claims = _token_serializer.loads(token[len(SIGNED_TOKEN_PREFIX):])
+    except BadSignature:
+        return None
+    if not isinstance(claims, dict) or claims.get('exp', 0) <= time.time():
+        return None
+    return claims
+
+def refresh_revocations(force=False):
+    """Load revocations added by any worker since the last refresh"""
+    now = time.monotonic()
+    if not force and now - _revocations_state['checked_at'] < TOKEN_REVOCATION_REFRESH:
+        return
+    _revocations_state['checked_at'] = now
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, key, revoked_at, expires_at FROM token_revocations
+        WHERE id > ? ORDER BY id
+    ''', (_revocations_state['last_id'],))
+    rows = cursor.fetchall()
+    conn.close()
+    wall_now = time.time()
+    with _revocations_lock:
+        for row in rows:
+            _revocations[row['key']] = (row['revoked_at'], row['expires_at'])
+            _revocations_state['last_id'] = row['id']
+        for key in [k for k, (_, expires_at) in _revocations.items() if expires_at < wall_now]:
+            del _revocations[key]
+
+def revoke_token_key(key, expires_at):
+    """Record a revocation in the database and in this worker's copy"""
+    revoked_at = time.time()
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('INSERT OR REPLACE INTO token_revocations (key, revoked_at, expires_at) VALUES (?,?,?)',
+                   (key, revoked_at, expires_at))
+    conn.commit()
+    conn.close()
+    with _revocations_lock:
+        _revocations[key] = (revoked_at, expires_at)
+
+def revoke_user_tokens(username):
+    """Invalidate every signed token issued to a user so far"""
+    revoke_token_key(f"user:{username}", time.time() + SIGNED_TOKEN_TTL)
+
+def is_token_revoked(claims):
+    refresh_revocations()
+    with _revocations_lock:
+        if claims['jti'] in _revocations:
+            return True
+        user_revocation = _revocations.get(f"user:{claims['sub']}")
+    return bool(user_revocation) and claims['iat'] <= user_revocation[0]
+
+def resolve_user(token):
+    """Return the active user owning a session or signed token, or None"""
+    if AUTH_TOKEN_MODE == 'signed' and token.startswith(SIGNED_TOKEN_PREFIX):
+        claims = decode_signed_token(token)
+        if not claims or is_token_revoked(claims):
+            return None
+        return {'id': claims['uid'], 'username': claims['sub'], 'role': claims['role'],
+                'team_id': claims['team_id'], 'active': 1}
+
+    now = time.monotonic()
+    with _auth_cache_lock:
+        cached = _auth_cache.get(token)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    conn = get_db()
+    cursor = conn.cursor()
+    created_cutoff, idle_cutoff = session_cutoffs()
+    cursor.execute('''
+        SELECT u.id, u.username, u.role, u.team_id, u.active, s.last_accessed
+        FROM sessions s
+        JOIN users u ON u.username = s.username
+        WHERE s.token = ? AND u.active = 1
+          AND s.created_at > ? AND s.last_accessed > ?
+    ''', (token, created_cutoff, idle_cutoff))
+    row = cursor.fetchone()
+    conn.close()
+    if not row:
+        invalidate_auth_cache(token=token)
+        return None
+
+    user = dict(row)
+    touch_session(token, user.pop('last_accessed'))
+    with _auth_cache_lock:
+        if len(_auth_cache) >= AUTH_CACHE_MAX:
+            _auth_cache.clear()
+        _auth_cache[token] = (now + AUTH_CACHE_TTL, user)
+    return user
+
+# Lifetime of a roster stream ticket, in seconds
+STREAM_TICKET_TTL = 60
+
+def issue_stream_ticket(token):
+    """Store a short-lived ticket standing in for ``token`` on the roster stream"""
+    ticket = secrets.token_urlsafe(32)
+    conn = get_db()
+    conn.execute('INSERT INTO stream_tickets (ticket, token, expires_at) VALUES (?, ?, ?)',
+                 (ticket, token, time.time() + STREAM_TICKET_TTL))
+    conn.commit()
+    conn.close()
+    return ticket
+
+def redeem_stream_ticket(ticket):
+    """Consume a ticket and return the token it stands for, or None"""
+    conn = get_db()
+    row = conn.execute('DELETE FROM stream_tickets WHERE ticket = ? RETURNING token, expires_at',
+                       (ticket,)).fetchone()
+    conn.commit()
+    conn.close()
+    if not row or row['expires_at'] < time.time():
+        return None
+    return row['token']
+
+def request_token():
+    """The caller's token.
+
+    EventSource cannot send an Authorization header, so the roster stream
+    also accepts ``?ticket=`` from POST /api/roster/stream/ticket. Tickets
+    are single use; the token behind one is kept on flask.g for the request.
+    """
+    token = request.headers.get('Authorization')
+    if token or request.endpoint != 'stream_roster':
+        return token
+    if 'stream_token' not in g:
+        ticket = request.args.get('ticket')
+        g.stream_token = redeem_stream_ticket(ticket) if ticket else None
+    return g.stream_token
+
 # Authentication decorator
 def require_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
+        token = request_token()
         if not token:
             return jsonify({'error': 'Unauthorized - No token'}), 401
-        
-        session = get_session(token)
-        if not session:
+
+        if not get_current_user():
             return jsonify({'error': 'Unauthorized - Invalid token'}), 401
-        
+
         return f(*args, **kwargs)
     return decorated_function
 
 def get_current_user():
-    token = request.headers.get('Authorization')
-    if not token:
-        return None
-    s = get_session(token)
-    if not s:
-        return None
-    username = s[0] if isinstance(s, tuple) else s[0] if hasattr(s, '__getitem__') else None
-    if not username:
-        return None
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, username, role, team_id, active FROM users WHERE username = ?', (username,))
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    """Resolve the caller once per request and keep it on flask.g"""
+    if 'user' not in g:
+        token = request_token()
+        g.user = resolve_user(token) if token else None
+    return g.user
 
 def require_role(roles):
     def decorator(f):
@@ -294,7 +1367,7 @@ def login():
 
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT username, password_hash, role, active, team_id FROM users WHERE username = ?', (username,))
+    cursor.execute('SELECT id, username, password_hash, role, active, team_id FROM users WHERE username = ?', (username,))
     row = cursor.fetchone()
     conn.close()
 
@@ -317,15 +1390,22 @@ def login():
     if not chk:
         return jsonify({'error': 'Invalid credentials'}), 401
 
-    token = f"token_{datetime.now().timestamp()}"
-    add_session(token, username)
+    if AUTH_TOKEN_MODE == 'signed':
+        token = issue_signed_token(user)
+    else:
+        token = secrets.token_urlsafe(32)
+        add_session(token, username)
     return jsonify({'token': token, 'username': username, 'role': user['role'], 'team_id': user['team_id']}), 200
 
 @app.route('/api/logout', methods=['POST'])
 @require_auth
 def logout():
     token = request.headers.get('Authorization')
-    delete_session(token)
+    claims = decode_signed_token(token) if AUTH_TOKEN_MODE == 'signed' else None
+    if claims:
+        revoke_token_key(claims['jti'], claims['exp'])
+    else:
+        delete_session(token)
     return jsonify({'message': 'Logged out successfully'}), 200
 
 @app.route('/api/validate', methods=['GET'])
@@ -339,11 +1419,7 @@ def validate():
 @app.route('/api/teams', methods=['GET'])
 @require_auth
 def list_teams():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, description, created_at FROM teams ORDER BY name')
-    teams = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    teams = cached_reference('teams', TEAMS_SCOPE, load_teams)
     return jsonify(teams), 200
 
 @app.route('/api/teams', methods=['POST'])
@@ -380,7 +1456,7 @@ def update_team(team_id):
     try:
         cursor.execute('UPDATE teams SET name = ?, description = ? WHERE id = ?', (name, description, team_id))
         conn.commit()
-        if conn.total_changes == 0:
+        if cursor.rowcount == 0:
             conn.close()
             return jsonify({'error': 'Team not found'}), 404
         conn.close()
@@ -479,10 +1555,16 @@ def update_user(user_id):
             WHERE id = ?
         ''', (username, new_role, new_team_id, new_active, datetime.now().isoformat(), user_id))
         conn.commit()
-        if conn.total_changes == 0:
+        if cursor.rowcount == 0:
             conn.close()
             return jsonify({'error': 'User not found'}), 404
         conn.close()
+        # Role, team or active flag may have changed: drop cached sessions
+        invalidate_auth_cache(username=existing['username'])
+        if (username, new_role, new_team_id, new_active) != (existing['username'], existing['role'],
+                                                              existing['team_id'], existing['active']):
+            # Signed tokens carry these claims, so make the user sign in again
+            revoke_user_tokens(existing['username'])
         return jsonify({'id': user_id, 'username': username, 'role': new_role, 'team_id': new_team_id, 'active': new_active}), 200
     except sqlite3.IntegrityError:
         conn.close()
@@ -503,6 +1585,7 @@ def delete_user(user_id):
     conn.commit()
     conn.close()
     delete_sessions_for_username(username)
+    revoke_user_tokens(username)
     return jsonify({'message': 'User deleted'}), 200
 
 @app.route('/api/users/<username>/password', methods=['PUT'])
@@ -517,7 +1600,7 @@ def reset_password(username):
     cursor.execute('UPDATE users SET password_hash = ?, updated_at = ? WHERE username = ?',
                    (generate_password_hash(new_password), datetime.now().isoformat(), username))
     conn.commit()
-    updated = conn.total_changes
+    updated = cursor.rowcount
     conn.close()
     if updated == 0:
         return jsonify({'error': 'User not found'}), 404
@@ -558,7 +1641,7 @@ def change_my_password():
     cursor.execute('UPDATE users SET password_hash = ?, updated_at = ? WHERE username = ?',
                    (generate_password_hash(new_password), datetime.now().isoformat(), user['username']))
     conn.commit()
-    updated = conn.total_changes
+    updated = cursor.rowcount
     conn.close()
 
     if updated == 0:
@@ -570,11 +1653,7 @@ def change_my_password():
 @app.route('/api/settings', methods=['GET'])
 @require_auth
 def get_settings():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT key, value FROM settings')
-    settings = {row['key']: row['value'] for row in cursor.fetchall()}
-    conn.close()
+    settings = cached_reference('settings', SETTINGS_SCOPE, load_settings)
     return jsonify(settings), 200
 
 @app.route('/api/settings/<key>', methods=['PUT'])
@@ -699,32 +1778,37 @@ def update_employee(emp_id):
             conn.close()
             return jsonify({'error': 'User has no team assigned'}), 400
         team_id = user['team_id']
-    elif not team_id:
+        cursor.execute('SELECT id, team_id FROM employees WHERE emp_id = ? AND team_id = ?', (emp_id, team_id))
+    else:
+        # prefer the employee already in the requested team, if any
+        cursor.execute('SELECT id, team_id FROM employees WHERE emp_id = ? ORDER BY team_id = ? DESC, id LIMIT 1',
+                       (emp_id, team_id))
+    employee = cursor.fetchone()
+    if not employee:
+        conn.close()
+        return jsonify({'error': 'Employee not found'}), 404
+    if not team_id:
         # allow super admin to keep current team if not provided
-        cursor.execute('SELECT team_id FROM employees WHERE emp_id = ?', (emp_id,))
-        row_team = cursor.fetchone()
-        team_id = row_team['team_id'] if row_team else None
+        team_id = employee['team_id']
 
     if not team_id:
         conn.close()
         return jsonify({'error': 'Team is required'}), 400
 
     # Check if the new emp_id already exists (excluding current employee)
-    if team_id:
-        cursor.execute('SELECT COUNT(*) as count FROM employees WHERE emp_id = ? AND emp_id != ? AND team_id = ?',
-                       (new_emp_id, emp_id, team_id))
-    else:
-        cursor.execute('SELECT COUNT(*) as count FROM employees WHERE emp_id = ? AND emp_id != ?',
-                       (new_emp_id, emp_id))
+    cursor.execute('SELECT COUNT(*) as count FROM employees WHERE emp_id = ? AND team_id = ? AND id != ?',
+                   (new_emp_id, team_id, employee['id']))
     count = dict(cursor.fetchone())['count']
     if count > 0:
         conn.close()
         return jsonify({'error': 'Employee ID already exists'}), 400
 
     try:
-        cursor.execute('UPDATE employees SET emp_id = ?, name = ?, team_id = ? WHERE emp_id = ?',
-                   (new_emp_id, new_name, team_id, emp_id))
-        cursor.execute('UPDATE roster SET emp_id = ?, team_id = ? WHERE emp_id = ? AND (team_id = ? OR team_id IS NULL)', (new_emp_id, team_id, emp_id, team_id))
+        # Roster rows reference employees.id, so a rename touches one row
+        cursor.execute('UPDATE employees SET emp_id = ?, name = ?, team_id = ? WHERE id = ?',
+                       (new_emp_id, new_name, team_id, employee['id']))
+        if str(team_id) != str(employee['team_id']):
+            cursor.execute('UPDATE roster SET team_id = ? WHERE employee_id = ?', (team_id, employee['id']))
         conn.commit()
         conn.close()
         return jsonify({'emp_id': new_emp_id, 'name': new_name}), 200
@@ -744,15 +1828,19 @@ def delete_employee(emp_id):
         if not team_filter:
             conn.close()
             return jsonify({'error': 'Team is required'}), 400
-        cursor.execute('DELETE FROM roster WHERE emp_id = ? AND team_id = ?', (emp_id, team_filter))
-        cursor.execute('DELETE FROM employees WHERE emp_id = ? AND team_id = ?', (emp_id, team_filter))
+        team_id = team_filter
     else:
         if not user.get('team_id'):
             conn.close()
             return jsonify({'error': 'User has no team assigned'}), 400
-        cursor.execute('DELETE FROM roster WHERE emp_id = ? AND team_id = ?', (emp_id, user['team_id']))
-        cursor.execute('DELETE FROM employees WHERE emp_id = ? AND team_id = ?', (emp_id, user['team_id']))
+        team_id = user['team_id']
 
+    cursor.execute('''
+        DELETE FROM roster WHERE employee_id IN (
+            SELECT id FROM employees WHERE emp_id = ? AND team_id = ?
+        )
+    ''', (emp_id, team_id))
+    cursor.execute('DELETE FROM employees WHERE emp_id = ? AND team_id = ?', (emp_id, team_id))
     conn.commit()
     conn.close()
     return jsonify({'message': 'Employee deleted successfully'}), 200
@@ -787,29 +1875,20 @@ def check_employee_id(emp_id):
 def get_shifts():
     shift_type = request.args.get('type')  # 'full', 'half', or None for all
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
+    shifts = cached_reference('shifts', SHIFTS_SCOPE, load_shifts)
     if shift_type:
-        cursor.execute('SELECT * FROM shifts WHERE type = ? ORDER BY shift_name', (shift_type,))
-    else:
-        cursor.execute('SELECT * FROM shifts ORDER BY shift_name')
+        shifts = [shift for shift in shifts if shift['type'] == shift_type]
     
-    shifts = [dict(row) for row in cursor.fetchall()]
-    conn.close()
     return jsonify(shifts), 200
 
 @app.route('/api/shifts/<int:shift_id>', methods=['GET'])
 @require_auth
 def get_shift(shift_id):
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM shifts WHERE id = ?', (shift_id,))
-    shift = cursor.fetchone()
-    conn.close()
+    shifts = cached_reference('shifts', SHIFTS_SCOPE, load_shifts)
+    shift = next((shift for shift in shifts if shift['id'] == shift_id), None)
     
     if shift:
-        return jsonify(dict(shift)), 200
+        return jsonify(shift), 200
     return jsonify({'error': 'Shift not found'}), 404
 
 @app.route('/api/shifts', methods=['POST'])
@@ -892,6 +1971,13 @@ def update_shift(shift_id):
 def delete_shift(shift_id):
     conn = get_db()
     cursor = conn.cursor()
+    # Keep the shift's text on roster history that still points at it
+    cursor.execute('''
+        UPDATE roster
+        SET shift_label = (SELECT shift_name || ' (' || shift_code || ')' FROM shifts WHERE id = ?),
+            shift_id = NULL
+        WHERE shift_id = ? AND shift_label IS NULL
+    ''', (shift_id, shift_id))
     cursor.execute('DELETE FROM shifts WHERE id = ?', (shift_id,))
     conn.commit()
     conn.close()
@@ -899,11 +1985,168 @@ def delete_shift(shift_id):
 
 # ==================== ROSTER ENDPOINTS ====================
 
+def fetch_roster_versions(cursor, team_id):
+    """Current (team version, shift catalog version) from data_versions"""
+    scope = team_scope(team_id)
+    cursor.execute('SELECT scope, version FROM data_versions WHERE scope IN (?, ?)', (scope, SHIFTS_SCOPE))
+    versions = {row['scope']: row['version'] for row in cursor.fetchall()}
+    return versions.get(scope, 0), versions.get(SHIFTS_SCOPE, 0)
+
+def roster_etag(team_id, versions, representation=''):
+    """ETag of a roster read: the request plus the data versions it renders.
+
+    Only data_versions has to be read to compute it, so a matching
+    If-None-Match can be answered without touching roster rows. Pass the
+    negotiated ``representation`` when it is not fully named by the query.
+    """
+    key = '|'.join([request.path, repr(sorted(request.args.items(multi=True))), team_scope(team_id),
+                    str(versions[0]), str(versions[1]), representation])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+def with_etag(response, etag):
+    """Mark a roster response so clients revalidate it with If-None-Match"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified(etag):
+    return with_etag(Response(status=304), etag)
+
+# Roster dates are stored as YYYY-MM-DD text, which sorts chronologically.
+# Month filters are written as date ranges so they can seek the
+# (team_id, date, ...) index instead of evaluating LIKE or strftime() per row.
+
+def month_bounds(month):
+    """First day of a YYYY-MM month and of the month after; raises ValueError if malformed"""
+    start_date = datetime.strptime(f"{month}-01", '%Y-%m-%d')
+    next_month = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start_date.strftime('%Y-%m-%d'), next_month.strftime('%Y-%m-%d')
+
+def latest_roster_date(cursor, team_id, before=None):
+    """Most recent roster date of a team (optionally before a date), or None"""
+    if before is None:
+        cursor.execute('SELECT MAX(date) AS date FROM roster WHERE team_id = ?', (team_id,))
+    else:
+        cursor.execute('SELECT MAX(date) AS date FROM roster WHERE team_id = ? AND date < ?', (team_id, before))
+    return cursor.fetchone()['date']
+
+def fetch_roster_months(cursor, team_id):
+    """Months (YYYY-MM, newest first) in which a team has roster data.
+
+    Each month costs one index seek for the latest date before it, so this
+    does not read every roster row the way DISTINCT strftime() did.
+    """
+    months = []
+    latest = latest_roster_date(cursor, team_id)
+    while latest:
+        month_start = latest[:7] + '-01'
+        months.append(latest[:7])
+        latest = latest_roster_date(cursor, team_id, before=month_start)
+    return months
+
+def fetch_roster_dates(cursor, team_id, month_filter=None, show_all=False):
+    """Return the sorted roster dates of a team for the requested view.
+
+    ``show_all`` selects the whole history, ``month_filter`` (YYYY-MM) a single
+    month, and otherwise the most recent month that has roster data. Raises
+    ValueError for a malformed ``month_filter``.
+    """
+    if show_all:
+        cursor.execute('SELECT DISTINCT date FROM roster WHERE team_id = ? ORDER BY date', (team_id,))
+        return [row['date'] for row in cursor.fetchall()]
+
+    if month_filter:
+        start_date, end_date = month_bounds(month_filter)
+    else:
+        latest = latest_roster_date(cursor, team_id)
+        if not latest:
+            return []
+        start_date, end_date = month_bounds(latest[:7])
+    cursor.execute('''
+        SELECT DISTINCT date FROM roster
+        WHERE team_id = ? AND date >= ? AND date < ?
+        ORDER BY date
+    ''', (team_id, start_date, end_date))
+    return [row['date'] for row in cursor.fetchall()]
+
+def fetch_roster_cells(cursor, team_id, start_date, end_date, catalog):
+    """Load all roster cells of a team between two dates (inclusive).
+
+    Returns a dict keyed by (employee_id, date) with (shift, status) display
+    values.
+    """
+    cursor.execute('''
+        SELECT employee_id, date, shift_id, shift_label, status_code, status_label
+        FROM roster
+        WHERE team_id = ? AND date >= ? AND date <= ?
+    ''', (team_id, start_date, end_date))
+    return {
+        (row['employee_id'], row['date']): (catalog.display(row['shift_id'], row['shift_label']),
+                                            decode_status(row['status_code'], row['status_label']))
+        for row in cursor
+    }
+
+def build_columnar_roster(cursor, team_id, employees, dates, catalog):
+    """Dictionary-encode a roster matrix for ``GET /api/roster?format=columnar``.
+
+    Shift and status display strings are listed once in ``shifts`` and
+    ``statuses``; each employee carries one index per entry of ``dates``
+    into those lists. Index 0 is the empty string used for days without
+    a roster entry. Cells are read as plain tuples and each distinct
+    stored value is rendered once, not once per cell.
+    """
+    date_pos = {date: i for i, date in enumerate(dates)}
+    employee_pos = {employee['id']: i for i, employee in enumerate(employees)}
+    shift_rows = [[0] * len(dates) for _ in employees]
+    status_rows = [[0] * len(dates) for _ in employees]
+    shift_index = {}
+    status_index = {}
+
+    if employees:
+        raw = cursor.connection.cursor()
+        raw.row_factory = None
+        raw.execute('''
+            SELECT employee_id, date, shift_id, shift_label, status_code, status_label
+            FROM roster
+            WHERE team_id = ? AND date >= ? AND date <= ?
+        ''', (team_id, dates[0], dates[-1]))
+        for employee_id, date, shift_id, shift_label, status_code, status_label in raw:
+            row = employee_pos.get(employee_id)
+            col = date_pos.get(date)
+            if row is None or col is None:
+                continue
+            shift_key = (shift_id, shift_label)
+            if shift_key not in shift_index:
+                shift_index[shift_key] = len(shift_index) + 1
+            status_key = (status_code, status_label)
+            if status_key not in status_index:
+                status_index[status_key] = len(status_index) + 1
+            shift_rows[row][col] = shift_index[shift_key]
+            status_rows[row][col] = status_index[status_key]
+
+    return {
+        'format': 'columnar',
+        'dates': dates,
+        'shifts': [''] + [catalog.display(*key) for key in shift_index],
+        'statuses': [''] + [decode_status(*key) for key in status_index],
+        'emp_ids': [employee['emp_id'] for employee in employees],
+        'names': [employee['name'] for employee in employees],
+        'shift_index': shift_rows,
+        'status_index': status_rows
+    }
+
 @app.route('/api/roster', methods=['GET'])
 @require_auth
 def get_roster():
+    """Roster matrix of a team.
+
+    ``format=columnar`` returns the compact form built by
+    build_columnar_roster() instead of one object per cell. ``version`` and
+    ``shifts_version`` are the starting point for /api/roster/changes.
+    """
     month_filter = request.args.get('month')  # Format: YYYY-MM
     show_all = request.args.get('all') == 'true'
+    columnar = request.args.get('format') == 'columnar'
     team_filter = request.args.get('team_id')
     user = get_current_user()
     if user['role'] != 'super_admin':
@@ -914,62 +2157,62 @@ def get_roster():
     conn = get_db()
     cursor = conn.cursor()
 
+    versions = fetch_roster_versions(cursor, team_filter)
+    etag = roster_etag(team_filter, versions)
+    if etag in request.if_none_match:
+        conn.close()
+        return not_modified(etag)
+
     # Get dates in roster based on filter
-    if show_all:
-        cursor.execute('SELECT DISTINCT date FROM roster WHERE team_id = ? ORDER BY date', (team_filter,))
-    elif month_filter:
-        cursor.execute('''
-            SELECT DISTINCT date FROM roster 
-            WHERE date LIKE ? AND team_id = ?
-            ORDER BY date
-        ''', (f"{month_filter}%", team_filter))
-    else:
-        cursor.execute('''
-            SELECT DISTINCT date FROM roster 
-            WHERE team_id = ? AND strftime('%Y-%m', date) = (
-                SELECT strftime('%Y-%m', MAX(date)) FROM roster WHERE team_id = ?
-            )
-            ORDER BY date
-        ''', (team_filter, team_filter))
-    
-    dates = [row['date'] for row in cursor.fetchall()]
+    try:
+        dates = fetch_roster_dates(cursor, team_filter, month_filter, show_all)
+    except ValueError:
+        conn.close()
+        return jsonify({'error': 'month must be in YYYY-MM format'}), 400
 
     if not dates:
         conn.close()
-        return jsonify({'dates': [], 'roster': [], 'available_months': []}), 200
+        if columnar:
+            return with_etag(jsonify({'format': 'columnar', 'dates': [], 'shifts': [''], 'statuses': [''],
+                                      'emp_ids': [], 'names': [], 'shift_index': [], 'status_index': [],
+                                      'available_months': [], 'version': versions[0],
+                                      'shifts_version': versions[1]}), etag), 200
+        return with_etag(jsonify({'dates': [], 'roster': [], 'available_months': [],
+                                  'version': versions[0], 'shifts_version': versions[1]}), etag), 200
+
+    catalog = get_shift_catalog()
 
     # Get all available months for filtering
-    cursor.execute('''
-        SELECT DISTINCT strftime('%Y-%m', date) as month 
-        FROM roster 
-        WHERE team_id = ?
-        ORDER BY month DESC
-    ''', (team_filter,))
-    available_months = [row['month'] for row in cursor.fetchall()]
+    available_months = fetch_roster_months(cursor, team_filter)
 
     # Get all employees
-    cursor.execute('SELECT emp_id, name FROM employees WHERE team_id = ? ORDER BY name', (team_filter,))
+    cursor.execute('SELECT id, emp_id, name FROM employees WHERE team_id = ? ORDER BY name', (team_filter,))
     employees = cursor.fetchall()
 
+    if columnar:
+        payload = build_columnar_roster(cursor, team_filter, employees, dates, catalog)
+        payload['available_months'] = available_months
+        payload['version'], payload['shifts_version'] = versions
+        conn.close()
+        return with_etag(jsonify(payload), etag), 200
+
+    # Fetch every cell for the team in the date range in one ordered scan
+    cells = fetch_roster_cells(cursor, team_filter, dates[0], dates[-1], catalog)
+
     # Create roster matrix
     roster_data = []
     for employee in employees:
         emp_id = employee['emp_id']
         emp_name = employee['name']
         shifts = []
-        
+
         for date in dates:
-            cursor.execute('''
-                SELECT shift, status 
-                FROM roster 
-                WHERE emp_id = ? AND date = ? AND team_id = ?
-            ''', (emp_id, date, team_filter))
-            result = cursor.fetchone()
+            result = cells.get((employee['id'], date))
             if result:
                 shifts.append({
                     'date': date,
-                    'shift': result['shift'],
-                    'status': result['status']
+                    'shift': result[0],
+                    'status': result[1]
                 })
             else:
                 shifts.append({
@@ -986,12 +2229,559 @@ def get_roster():
         })
 
     conn.close()
-    return jsonify({
+    return with_etag(jsonify({
         'dates': dates, 
         'roster': roster_data,
-        'available_months': available_months
+        'available_months': available_months,
+        'version': versions[0],
+        'shifts_version': versions[1]
+    }), etag), 200
+
+# Changed cells returned by one /api/roster/changes call before asking
+# the client to reload instead
+MAX_DELTA_CELLS = 2000
+
+def fetch_roster_delta(cursor, team_id, since, version, date_range=None):
+    """Current value of every cell of a team changed in (since, version].
+
+    Returns None when the change log cannot express the difference: it has
+    been pruned past ``since``, employees themselves changed, or more than
+    MAX_DELTA_CELLS cells changed. ``date_range`` is an optional
+    [start, end) pair of dates to limit the cells to.
+    """
+    # Every version bump logs exactly one row, so a gap means pruned entries
+    cursor.execute('''
+        SELECT COUNT(*) AS logged, COUNT(DISTINCT employee_id || ' ' || date) AS cells,
+               COUNT(*) - COUNT(date) AS employee_changes
+        FROM roster_changes
+        WHERE team_id = ? AND version > ? AND version <= ?
+    ''', (team_id, since, version))
+    log = cursor.fetchone()
+    if (since > version or log['logged'] != version - since or log['employee_changes']
+            or log['cells'] > MAX_DELTA_CELLS):
+        return None
+    if since == version:
+        return []
+
+    params = [team_id, team_id, since, version]
+    date_filter = ''
+    if date_range:
+        date_filter = 'AND c.date >= ? AND c.date < ?'
+        params.extend(date_range)
+    cursor.execute(f'''
+        SELECT DISTINCT e.emp_id, c.date, r.id AS roster_id, r.shift_id, r.shift_label,
+               r.status_code, r.status_label
+        FROM roster_changes c
+        JOIN employees e ON e.id = c.employee_id
+        LEFT JOIN roster r ON r.employee_id = c.employee_id AND r.date = c.date AND r.team_id = ?
+        WHERE c.team_id = ? AND c.version > ? AND c.version <= ? {date_filter}
+        ORDER BY e.emp_id, c.date
+    ''', params)
+    rows = cursor.fetchall()
+    catalog = get_shift_catalog()
+
+    changes = []
+    for row in rows:
+        if row['roster_id'] is None:
+            changes.append({'emp_id': row['emp_id'], 'date': row['date'],
+                            'shift': '', 'status': '', 'deleted': True})
+        else:
+            changes.append({
+                'emp_id': row['emp_id'],
+                'date': row['date'],
+                'shift': catalog.display(row['shift_id'], row['shift_label']),
+                'status': decode_status(row['status_code'], row['status_label']),
+                'deleted': False
+            })
+    return changes
+
+@app.route('/api/roster/changes', methods=['GET'])
+@require_auth
+def get_roster_changes():
+    """Roster cells of a team changed after version ``since``.
+
+    Each changed cell is returned once with its current value, or with
+    ``deleted`` set if it no longer exists; ``month`` limits the cells to
+    one YYYY-MM month. ``reload`` is true when the change log cannot bring
+    the client up to date (see fetch_roster_delta) or the shift catalog
+    changed since ``shifts_version``. Poll again with ``since`` set to the
+    returned ``version``.
+    """
+    team_filter = request.args.get('team_id')
+    user = get_current_user()
+    if user['role'] != 'super_admin':
+        team_filter = user.get('team_id')
+    if not team_filter:
+        return jsonify({'error': 'Team is required'}), 400
+    try:
+        since = int(request.args.get('since', ''))
+        shifts_since = request.args.get('shifts_version')
+        shifts_since = int(shifts_since) if shifts_since is not None else None
+        date_range = month_bounds(request.args['month']) if request.args.get('month') else None
+    except ValueError:
+        return jsonify({'error': 'since and shifts_version must be integers and month YYYY-MM'}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
+    version, shifts_version = fetch_roster_versions(cursor, team_filter)
+    changes = None
+    if shifts_since is None or shifts_since == shifts_version:
+        changes = fetch_roster_delta(cursor, team_filter, since, version, date_range)
+    conn.close()
+
+    return jsonify({
+        'version': version,
+        'shifts_version': shifts_version,
+        'reload': changes is None,
+        'changes': changes or []
     }), 200
 
+# -------------------- LIVE ROSTER STREAM --------------------
+# Each worker runs one watcher thread with its own connection. It polls
+# PRAGMA data_version, which changes whenever any connection in any process
+# commits, and on a change turns the team version bumps in data_versions into
+# delta events for the SSE listeners of this worker. Every listener holds a
+# worker thread, so run gunicorn with --threads and keep the cap below it.
+ROSTER_STREAM_MAX_LISTENERS = int(os.getenv('ROSTER_STREAM_MAX_LISTENERS', '8'))
+ROSTER_STREAM_POLL_INTERVAL = float(os.getenv('ROSTER_STREAM_POLL_INTERVAL', '1'))
+ROSTER_STREAM_KEEPALIVE = 15
+# Events buffered per listener before it is told to reload instead
+ROSTER_STREAM_QUEUE_SIZE = 64
+
+_stream_lock = threading.Lock()
+_stream_listeners = {}  # team scope -> set of listener queues
+_stream_versions = {}  # team scope -> version already published
+_stream_shifts_version = None
+_stream_pid = None
+
+def sse_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+def push_stream_event(listener, message):
+    """Queue an event; a listener that fell behind gets a single reload instead"""
+    try:
+        listener.put_nowait(message)
+    except queue.Full:
+        while True:
+            try:
+                listener.get_nowait()
+            except queue.Empty:
+                break
+        listener.put_nowait(sse_event('reload', {}))
+
+def add_stream_listener(cursor, team_id):
+    """Register a listener queue for a team; returns (queue, version) or (None, None) when full.
+
+    ``version`` is where the watcher will continue publishing from, so the
+    caller only has to send what happened before it.
+    """
+    global _stream_pid, _stream_shifts_version
+    scope = team_scope(team_id)
+    with _stream_lock:
+        if sum(len(listeners) for listeners in _stream_listeners.values()) >= ROSTER_STREAM_MAX_LISTENERS:
+            return None, None
+        if scope not in _stream_versions or _stream_shifts_version is None:
+            version, shifts_version = fetch_roster_versions(cursor, team_id)
+            _stream_versions.setdefault(scope, version)
+            if _stream_shifts_version is None:
+                _stream_shifts_version = shifts_version
+        listener = queue.Queue(maxsize=ROSTER_STREAM_QUEUE_SIZE)
+        _stream_listeners.setdefault(scope, set()).add(listener)
+        if _stream_pid != os.getpid():
+            _stream_pid = os.getpid()
+            threading.Thread(target=_roster_stream_loop, name='roster-stream', daemon=True).start()
+        return listener, _stream_versions[scope]
+
+def remove_stream_listener(team_id, listener):
+    scope = team_scope(team_id)
+    with _stream_lock:
+        listeners = _stream_listeners.get(scope)
+        if listeners is None:
+            return
+        listeners.discard(listener)
+        if not listeners:
+            # Nobody listens any more; start from the current version next time
+            del _stream_listeners[scope]
+            _stream_versions.pop(scope, None)
+
+def publish_roster_changes(conn):
+    """Send listeners the changes committed since the last call"""
+    global _stream_shifts_version
+    cursor = conn.cursor()
+    cursor.execute('SELECT scope, version FROM data_versions')
+    current = {row['scope']: row['version'] for row in cursor.fetchall()}
+    with _stream_lock:
+        shifts_version = current.get(SHIFTS_SCOPE, 0)
+        if _stream_shifts_version is not None and shifts_version != _stream_shifts_version:
+            _stream_shifts_version = shifts_version
+            for scope, listeners in _stream_listeners.items():
+                _stream_versions[scope] = current.get(scope, 0)
+                for listener in listeners:
+                    push_stream_event(listener, sse_event('reload', {'version': _stream_versions[scope]},
+                                                          _stream_versions[scope]))
+            return
+
+        for scope, listeners in _stream_listeners.items():
+            since = _stream_versions.get(scope, 0)
+            version = current.get(scope, 0)
+            if version == since:
+                continue
+            changes = fetch_roster_delta(cursor, scope.split(':', 1)[1], since, version)
+            if changes is None:
+                message = sse_event('reload', {'version': version}, version)
+            else:
+                message = sse_event('changes', {'version': version, 'changes': changes}, version)
+            for listener in listeners:
+                push_stream_event(listener, message)
+            _stream_versions[scope] = version
+
+def _roster_stream_loop():
+    conn = connect_db()
+    last_data_version = None
+    while True:
+        time.sleep(ROSTER_STREAM_POLL_INTERVAL)
+        try:
+            data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != last_data_version:
+                last_data_version = data_version
+                publish_roster_changes(conn)
+        except Exception as e:
+            app.logger.error(f"Roster stream watcher failed: {e}")
+
+@app.route('/api/roster/stream/ticket', methods=['POST'])
+@require_auth
+def create_stream_ticket():
+    """Single-use ticket for opening /api/roster/stream with an EventSource"""
+    ticket = issue_stream_ticket(request_token())
+    return jsonify({'ticket': ticket, 'expires_in': STREAM_TICKET_TTL}), 200
+
+@app.route('/api/roster/stream', methods=['GET'])
+@require_auth
+def stream_roster():
+    """Server-Sent Events with the roster changes of a team.
+
+    ``changes`` events carry the same cells as /api/roster/changes and
+    ``reload`` events ask the client to fetch the full roster. The event id
+    is the team version, so pass ``since`` (or let the browser send
+    Last-Event-ID) to catch up after a reconnect.
+    """
+    team_filter = request.args.get('team_id')
+    user = get_current_user()
+    if user['role'] != 'super_admin':
+        team_filter = user.get('team_id')
+    if not team_filter:
+        return jsonify({'error': 'Team is required'}), 400
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'since must be an integer'}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
+    listener, version = add_stream_listener(cursor, team_filter)
+    if listener is None:
+        conn.close()
+        return jsonify({'error': 'Too many live roster listeners, try again later'}), 503
+    catch_up = None
+    if since is not None:
+        changes = fetch_roster_delta(cursor, team_filter, since, version)
+        if changes is None:
+            catch_up = sse_event('reload', {'version': version}, version)
+        elif changes:
+            catch_up = sse_event('changes', {'version': version, 'changes': changes}, version)
+    # Streams are long-lived; give the pooled connection back now
+    conn.close()
+    release_db(None)
+    token = request_token()
+
+    def generate():
+        try:
+            yield f'retry: 5000\nid: {version}\n\n'
+            if catch_up:
+                yield catch_up
+            while True:
+                try:
+                    yield listener.get(timeout=ROSTER_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    # Stop streaming once the session or token is no longer valid
+                    still_valid = resolve_user(token)
+                    release_db(None)
+                    if not still_valid:
+                        return
+                    yield ': keepalive\n\n'
+        finally:
+            remove_stream_listener(team_filter, listener)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# -------------------- ROSTER ANALYTICS --------------------
+# Coverage, hours and OFF counts over a range of months. The team's cells are
+# loaded once into flat NumPy arrays (employee, day, shift and status index
+# per cell) and every figure is a bincount over them. Results are cached per
+# worker next to the team and shift versions they were computed from.
+ROSTER_ANALYTICS_MAX_MONTHS = 24
+ROSTER_ANALYTICS_CACHE_SIZE = 32
+
+_analytics_lock = threading.Lock()
+_analytics_cache = OrderedDict()  # (team_id, start_date, end_date) -> (versions, payload)
+
+def lookup_index(keys, values):
+    """Position of each of ``values`` in ``keys`` (-1 where missing)"""
+    if not len(keys):
+        return np.full(len(values), -1, dtype=np.int64)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    pos = np.clip(np.searchsorted(sorted_keys, values), 0, len(keys) - 1)
+    return np.where(sorted_keys[pos] == values, order[pos], -1)
+
+def day_offsets(dates, first_day):
+    """Days from ``first_day`` to each YYYY-MM-DD string; -1 where a date is invalid"""
+    try:
+        return (np.array(dates, dtype='datetime64[D]') - first_day).astype(np.int64)
+    except ValueError:
+        pass
+    # Some stored date does not exist (2025-02-30); convert one at a time
+    def offset(date):
+        try:
+            return int((np.datetime64(date, 'D') - first_day).astype(np.int64))
+        except ValueError:
+            return -1
+    return np.fromiter((offset(date) for date in dates), np.int64, len(dates))
+
+def build_roster_analytics(cursor, team_id, start_date, end_date, employees, shifts):
+    """Analytics payload for the roster cells of a team in [start_date, end_date)"""
+    days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D'))
+    months = days.astype('datetime64[M]')
+    month_labels = np.unique(months)
+    day_month = (months - month_labels[0]).astype(np.int64)
+    # 1970-01-05 was a Monday
+    day_weekday = (days - np.datetime64('1970-01-05', 'D')).astype(np.int64) % 7
+    n_days, n_months = len(days), len(month_labels)
+    n_employees, n_shifts = len(employees), len(shifts)
+    n_statuses = len(STATUS_CODES) + 1  # status index 0 is any free-text status
+
+    raw = cursor.connection.cursor()
+    raw.row_factory = None
+    # Malformed dates that sort inside the range (2025-10-1) are left out
+    raw.execute('''
+        SELECT employee_id, date, shift_id, status_code FROM roster
+        WHERE team_id = ? AND date >= ? AND date < ?
+          AND date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+    ''', (team_id, start_date, end_date))
+    rows = raw.fetchall()
+    count = len(rows)
+    employee_col = np.fromiter((-1 if row[0] is None else row[0] for row in rows), np.int64, count)
+    day = day_offsets([row[1] for row in rows], days[0])
+    shift_col = np.fromiter((-1 if row[2] is None else row[2] for row in rows), np.int64, count)
+    status = np.fromiter((row[3] if row[3] in STATUS_NAMES else 0 for row in rows), np.int64, count)
+
+    employee = lookup_index(np.array([e['id'] for e in employees], dtype=np.int64), employee_col)
+    shift = lookup_index(np.array([s['id'] for s in shifts], dtype=np.int64), shift_col)
+    # Cells of employees that have since left the team are not attributed
+    keep = (employee >= 0) & (day >= 0) & (day < n_days)
+    employee, day, shift, status = employee[keep], day[keep], shift[keep], status[keep]
+
+    worked = (status != STATUS_OFF) & (shift >= 0)
+    headcount = np.bincount(shift[worked] * n_days + day[worked],
+                            minlength=n_shifts * n_days).reshape(n_shifts, n_days)
+    durations = np.array([s['duration'] or 0 for s in shifts], dtype=np.float64)
+    hours = np.bincount(employee[worked], weights=durations[shift[worked]], minlength=n_employees)
+    by_employee = np.bincount(employee * n_statuses + status,
+                              minlength=n_employees * n_statuses).reshape(n_employees, n_statuses)
+    by_month = np.bincount(day_month[day] * n_statuses + status,
+                           minlength=n_months * n_statuses).reshape(n_months, n_statuses)
+    off_by_weekday = np.bincount(day_weekday[day[status == STATUS_OFF]], minlength=7)
+
+    def status_counts(counts):
+        counts = counts.tolist()
+        return {'full_days': counts[STATUS_FULL_DAY], 'half_days': counts[STATUS_HALF_DAY],
+                'off_days': counts[STATUS_OFF], 'other_days': counts[0]}
+
+    covered = np.flatnonzero(headcount.any(axis=1))
+    return {
+        'dates': np.datetime_as_string(days).tolist(),
+        'coverage': [
+            {'shift_id': shifts[i]['id'], 'shift_name': shifts[i]['shift_name'],
+             'shift_code': shifts[i]['shift_code'], 'headcount': headcount[i].tolist()}
+            for i in covered.tolist()
+        ],
+        'employees': [
+            dict(emp_id=employees[i]['emp_id'], name=employees[i]['name'],
+                 hours=round(float(hours[i]), 2), **status_counts(by_employee[i]))
+            for i in range(n_employees)
+        ],
+        'months': [
+            dict(month=str(month_labels[i]), **status_counts(by_month[i]))
+            for i in range(n_months)
+        ],
+        # Monday first
+        'off_by_weekday': off_by_weekday.tolist()
+    }
+
+@app.route('/api/roster/analytics', methods=['GET'])
+@require_auth
+def get_roster_analytics():
+    """Daily headcount per shift, hours per employee and status counts.
+
+    Covers the months ``from`` to ``to`` (YYYY-MM, inclusive); without them,
+    the team's most recent month with roster data.
+    """
+    team_filter = request.args.get('team_id')
+    user = get_current_user()
+    if user['role'] != 'super_admin':
+        team_filter = user.get('team_id')
+    if not team_filter:
+        return jsonify({'error': 'Team is required'}), 400
+    first_month = request.args.get('from')
+    last_month = request.args.get('to') or first_month
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    versions = fetch_roster_versions(cursor, team_filter)
+    etag = roster_etag(team_filter, versions)
+    if etag in request.if_none_match:
+        conn.close()
+        return not_modified(etag)
+
+    if not first_month:
+        latest = latest_roster_date(cursor, team_filter)
+        first_month = last_month = latest[:7] if latest else datetime.now().strftime('%Y-%m')
+    try:
+        start_date, _ = month_bounds(first_month)
+        last_start, end_date = month_bounds(last_month)
+    except ValueError:
+        conn.close()
+        return jsonify({'error': 'from and to must be in YYYY-MM format'}), 400
+    span = (int(last_month[:4]) - int(first_month[:4])) * 12 + int(last_month[5:7]) - int(first_month[5:7]) + 1
+    if span < 1 or span > ROSTER_ANALYTICS_MAX_MONTHS:
+        conn.close()
+        return jsonify({'error': f'from must not be after to, and at most {ROSTER_ANALYTICS_MAX_MONTHS} months apart'}), 400
+
+    key = (str(team_filter), start_date, end_date)
+    with _analytics_lock:
+        cached = _analytics_cache.get(key)
+        if cached is not None and cached[0] == versions:
+            _analytics_cache.move_to_end(key)
+            payload = cached[1]
+        else:
+            payload = None
+
+    if payload is None:
+        cursor.execute('SELECT id, emp_id, name FROM employees WHERE team_id = ? ORDER BY name', (team_filter,))
+        employees = cursor.fetchall()
+        shifts = cached_reference('shifts', SHIFTS_SCOPE, load_shifts)
+        payload = build_roster_analytics(cursor, team_filter, start_date, end_date, employees, shifts)
+        payload.update({'from': first_month, 'to': last_month,
+                        'version': versions[0], 'shifts_version': versions[1]})
+        with _analytics_lock:
+            _analytics_cache[key] = (versions, payload)
+            _analytics_cache.move_to_end(key)
+            while len(_analytics_cache) > ROSTER_ANALYTICS_CACHE_SIZE:
+                _analytics_cache.popitem(last=False)
+
+    conn.close()
+    return with_etag(jsonify(payload), etag), 200
+
+def is_roster_date(value):
+    """True if ``value`` is a YYYY-MM-DD string"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d') == value
+    except (TypeError, ValueError):
+        return False
+
+def month_dates(month):
+    """All YYYY-MM-DD dates of a YYYY-MM month; raises ValueError if malformed"""
+    start_date = datetime.strptime(f"{month}-01", '%Y-%m-%d')
+    next_month = start_date.replace(day=28) + timedelta(days=4)
+    end_date = next_month - timedelta(days=next_month.day)
+    return [(start_date + timedelta(days=i)).strftime('%Y-%m-%d')
+            for i in range((end_date - start_date).days + 1)]
+
+def build_month_rows(all_dates, default_shift_id, off_dates, half_shift_map):
+    """Return (date, shift_id, status_code) for every day of the month"""
+    off_dates = set(off_dates)
+    rows = []
+    for date in all_dates:
+        if date in off_dates:
+            rows.append((date, None, STATUS_OFF))
+        elif date in half_shift_map:
+            rows.append((date, half_shift_map[date], STATUS_HALF_DAY))
+        else:
+            rows.append((date, default_shift_id, STATUS_FULL_DAY))
+    return rows
+
+# One statement per cell: the (employee_id, date) unique index turns a
+# repeated write into an update of the existing row
+ROSTER_ON_CONFLICT = '''
+    ON CONFLICT (employee_id, date) DO UPDATE SET
+        team_id = excluded.team_id,
+        shift_id = excluded.shift_id, shift_label = excluded.shift_label,
+        status_code = excluded.status_code, status_label = excluded.status_label
+'''
+ROSTER_UPSERT_SQL = '''
+    INSERT INTO roster (employee_id, date, team_id, shift_id, shift_label, status_code, status_label)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+''' + ROSTER_ON_CONFLICT
+
+def save_employee_month(cursor, employee_id, team_id, month, rows):
+    """Bring an employee's stored month in line with ``rows``; the caller commits.
+
+    Only cells that differ are written: missing days are inserted, changed
+    days updated in place, and stray rows deleted. Returns the number of
+    inserted, updated and deleted rows.
+    """
+    return save_team_month(cursor, team_id, month, {employee_id: rows})
+
+def save_team_month(cursor, team_id, month, employee_rows):
+    """save_employee_month for every ``employee_id: rows`` pair of a team.
+
+    The stored months are read in one query and each kind of write is one
+    executemany, however many employees there are.
+    """
+    start_date, end_date = month_bounds(month)
+    cursor.execute('''
+        SELECT id, employee_id, date, shift_id, shift_label, status_code, status_label FROM roster
+        WHERE employee_id IN (SELECT value FROM json_each(?)) AND team_id = ? AND date >= ? AND date < ?
+    ''', (json.dumps(sorted(employee_rows)), team_id, start_date, end_date))
+    stored = {
+        (row['employee_id'], row['date']):
+            (row['id'], (row['shift_id'], row['shift_label'], row['status_code'], row['status_label']))
+        for row in cursor.fetchall()
+    }
+
+    to_insert = []
+    to_update = []
+    for employee_id, rows in employee_rows.items():
+        for date, shift_id, status_code in rows:
+            current = stored.pop((employee_id, date), None)
+            if current is None:
+                to_insert.append((employee_id, date, team_id, shift_id, None, status_code, None))
+            elif current[1] != (shift_id, None, status_code, None):
+                to_update.append((shift_id, status_code, current[0]))
+    to_delete = [(row_id,) for row_id, _ in stored.values()]
+
+    if to_delete:
+        cursor.executemany('DELETE FROM roster WHERE id = ?', to_delete)
+    if to_update:
+        cursor.executemany('''
+            UPDATE roster SET shift_id = ?, shift_label = NULL, status_code = ?, status_label = NULL
+            WHERE id = ?
+        ''', to_update)
+    if to_insert:
+        # A teamless legacy row for the same day is taken over, not duplicated
+        cursor.executemany(ROSTER_UPSERT_SQL, to_insert)
+    return {'inserted': len(to_insert), 'updated': len(to_update), 'deleted': len(to_delete)}
+
 @app.route('/api/roster', methods=['POST'])
 @require_auth
 def create_roster():
@@ -1015,61 +2805,144 @@ def create_roster():
     conn = get_db()
     cursor = conn.cursor()
 
-    # Get default shift details
-    cursor.execute('SELECT shift_name, shift_code FROM shifts WHERE id = ?', (default_shift_id,))
-    default_shift = cursor.fetchone()
-    if not default_shift:
+    # Get default and half shift details
+    catalog = get_shift_catalog()
+    default_shift_id = catalog.resolve_id(default_shift_id)
+    if default_shift_id is None:
         conn.close()
         return jsonify({'error': 'Invalid shift ID'}), 400
-    
-    default_shift_display = f"{default_shift['shift_name']} ({default_shift['shift_code']})"
 
-    # Get half shift details
     half_shift_map = {}
     for half_date in half_dates:
-        shift_id = half_date.get('shift_id')
-        cursor.execute('SELECT shift_name, shift_code FROM shifts WHERE id = ?', (shift_id,))
-        shift = cursor.fetchone()
-        if shift:
-            half_shift_map[half_date['date']] = f"{shift['shift_name']} ({shift['shift_code']})"
+        half_shift_id = catalog.resolve_id(half_date.get('shift_id'))
+        if half_shift_id is not None:
+            half_shift_map[half_date['date']] = half_shift_id
 
     # Ensure employee belongs to team
-    cursor.execute('SELECT emp_id, name, team_id FROM employees WHERE emp_id = ? AND team_id = ?', (emp_id, team_id))
+    cursor.execute('SELECT id, emp_id, name, team_id FROM employees WHERE emp_id = ? AND team_id = ?', (emp_id, team_id))
     employee = cursor.fetchone()
     if not employee:
         conn.close()
         return jsonify({'error': 'Employee not found in team'}), 400
 
-    # Generate all dates for the month
-    start_date = datetime.strptime(f"{month}-01", '%Y-%m-%d')
-    next_month = start_date.replace(day=28) + timedelta(days=4)
-    end_date = next_month - timedelta(days=next_month.day)
-    all_dates = [(start_date + timedelta(days=i)).strftime('%Y-%m-%d')
-                 for i in range((end_date - start_date).days + 1)]
-
-    # Delete existing roster for this employee and month within team
-    cursor.execute('DELETE FROM roster WHERE emp_id = ? AND team_id = ? AND date LIKE ?', (emp_id, team_id, f"{month}%"))
+    rows = build_month_rows(month_dates(month), default_shift_id, off_dates, half_shift_map)
+    changes = save_employee_month(cursor, employee['id'], team_id, month, rows)
 
-    # Insert roster entries
-    for date in all_dates:
-        status = 'Full Day'
-        shift_display = default_shift_display
+    conn.commit()
+    conn.close()
+    return jsonify({'message': 'Roster created successfully', 'changes': changes}), 201
+
+def plan_bulk_entry(entry, fallback_shift_id, catalog, month, all_dates):
+    """Validate one employee of a bulk request; returns (rows, error)"""
+    default_shift_id = catalog.resolve_id(entry.get('shift_id') or fallback_shift_id)
+    if default_shift_id is None:
+        return None, 'Invalid or missing default shift'
+
+    month_date_set = set(all_dates)
+    off_dates = entry.get('off_dates') or []
+    half_dates = entry.get('half_dates') or []
+    if not isinstance(off_dates, list) or not isinstance(half_dates, list):
+        return None, 'off_dates and half_dates must be lists'
+    for date in off_dates:
+        if not isinstance(date, str) or date not in month_date_set:
+            return None, f'OFF date {date} is not in {month}'
 
-        if date in off_dates:
-            status = 'OFF'
-            shift_display = 'N/A'
-        elif date in half_shift_map:
-            status = 'Half Day'
-            shift_display = half_shift_map[date]
+    half_shift_map = {}
+    for half_date in half_dates:
+        half_date = half_date if isinstance(half_date, dict) else {}
+        date = half_date.get('date')
+        if not isinstance(date, str) or date not in month_date_set:
+            return None, f'Half day {date} is not in {month}'
+        half_shift_id = catalog.resolve_id(half_date.get('shift_id'))
+        if half_shift_id is None:
+            return None, f'Invalid shift for half day {date}'
+        half_shift_map[date] = half_shift_id
+
+    return build_month_rows(all_dates, default_shift_id, off_dates, half_shift_map), None
+
+@app.route('/api/roster/bulk', methods=['POST'])
+@require_auth
+def create_roster_bulk():
+    """Create a month of roster for many employees of a team at once.
+
+    Body: ``{"month": "YYYY-MM", "team_id": 1, "shift_id": 5, "employees": [
+    {"emp_id": "...", "shift_id": 6, "off_dates": [...], "half_dates": [
+    {"date": "...", "shift_id": 9}]}]}``. The top-level ``shift_id`` is the
+    default for employees that do not name their own. Every entry is
+    validated before anything is written; valid entries are saved in one
+    transaction and invalid ones are reported in ``errors``.
+    """
+    data = request.json or {}
+    month = data.get('month')
+    team_id = data.get('team_id')
+    entries = data.get('employees') or []
 
-        cursor.execute('''
-            INSERT INTO roster (emp_id, date, shift, status, team_id)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (emp_id, date, shift_display, status, team_id))
+    user = get_current_user()
+    if user['role'] != 'super_admin':
+        team_id = user.get('team_id')
+    if not team_id:
+        return jsonify({'error': 'Team is required'}), 400
+    if not month or not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'month and a non-empty employees list are required'}), 400
+    try:
+        all_dates = month_dates(month)
+    except ValueError:
+        return jsonify({'error': 'month must be in YYYY-MM format'}), 400
 
-    conn.commit()
+    conn = get_db()
+    cursor = conn.cursor()
+    catalog = get_shift_catalog()
+    cursor.execute('SELECT id, emp_id FROM employees WHERE team_id = ? ORDER BY id DESC', (team_id,))
+    team_employee_ids = {row['emp_id']: row['id'] for row in cursor.fetchall()}
+
+    errors = []
+    planned = []
+    seen = set()
+    for entry in entries:
+        entry = entry if isinstance(entry, dict) else {}
+        emp_id = entry.get('emp_id')
+        if not emp_id:
+            errors.append({'emp_id': emp_id, 'error': 'emp_id is required'})
+            continue
+        if not isinstance(emp_id, str):
+            errors.append({'emp_id': emp_id, 'error': 'emp_id must be a string'})
+            continue
+        if emp_id in seen:
+            errors.append({'emp_id': emp_id, 'error': 'Employee listed more than once'})
+            continue
+        seen.add(emp_id)
+        if emp_id not in team_employee_ids:
+            errors.append({'emp_id': emp_id, 'error': 'Employee not found in team'})
+            continue
+
+        rows, error = plan_bulk_entry(entry, data.get('shift_id'), catalog, month, all_dates)
+        if error:
+            errors.append({'emp_id': emp_id, 'error': error})
+            continue
+        planned.append((emp_id, rows))
+
+    employee_rows = {team_employee_ids[emp_id]: rows for emp_id, rows in planned}
+    changes = {'inserted': 0, 'updated': 0, 'deleted': 0}
+    try:
+        if employee_rows:
+            with deferred_roster_stats(conn, employee_rows, len(employee_rows) * len(all_dates)):
+                changes = save_team_month(cursor, team_id, month, employee_rows)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        conn.close()
+        app.logger.error(f"Bulk roster save failed: {e}")
+        return jsonify({'error': 'Failed to save roster', 'errors': errors}), 500
     conn.close()
-    return jsonify({'message': 'Roster created successfully'}), 201
+
+    saved = [emp_id for emp_id, _ in planned]
+    return jsonify({
+        'message': f'Roster created for {len(saved)} employees',
+        'month': month,
+        'saved': saved,
+        'changes': changes,
+        'errors': errors
+    }), 201 if saved else 400
 
 @app.route('/api/roster/<emp_id>/<date>', methods=['PUT'])
 @require_auth
@@ -1086,24 +2959,102 @@ def update_roster_entry(emp_id, date):
 
     if not all([shift, status]):
         return jsonify({'error': 'Shift and status are required'}), 400
+    if not is_roster_date(date):
+        return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
 
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT id FROM roster WHERE emp_id = ? AND date = ? AND team_id = ?', (emp_id, date, team_id))
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
-        return jsonify({'error': 'Roster entry not found for team'}), 404
+    shift_id, shift_label = get_shift_catalog().encode(shift)
+    status_code, status_label = encode_status(status)
     cursor.execute('''
-        UPDATE roster 
-        SET shift = ?, status = ?
-        WHERE emp_id = ? AND date = ? AND team_id = ?
-    ''', (shift, status, emp_id, date, team_id))
+        INSERT INTO roster (employee_id, date, team_id, shift_id, shift_label, status_code, status_label)
+        SELECT id, ?, team_id, ?, ?, ?, ? FROM employees
+        WHERE emp_id = ? AND team_id = ?
+        ORDER BY id LIMIT 1
+    ''' + ROSTER_ON_CONFLICT, (date, shift_id, shift_label, status_code, status_label, emp_id, team_id))
+    if not cursor.rowcount:
+        conn.close()
+        return jsonify({'error': 'Employee not found in team'}), 404
     conn.commit()
     conn.close()
-    
+
     return jsonify({'message': 'Roster entry updated successfully'}), 200
 
+# Upper bound on cells accepted by one PATCH /api/roster request
+MAX_BATCH_CELLS = 5000
+
+@app.route('/api/roster', methods=['PATCH'])
+@require_auth
+def update_roster_entries():
+    """Write many roster cells in one transaction.
+
+    Body: ``{"team_id": 1, "changes": [{"emp_id": "...", "date": "YYYY-MM-DD",
+    "shift": "...", "status": "..."}]}``. Cells that do not exist yet are
+    created. Either every change is applied or none is; ``results`` reports
+    the outcome of each cell in request order.
+    """
+    data = request.json or {}
+    team_id = data.get('team_id')
+    changes = data.get('changes')
+    user = get_current_user()
+    if user['role'] != 'super_admin':
+        team_id = user.get('team_id')
+    if not team_id:
+        return jsonify({'error': 'Team is required'}), 400
+    if not isinstance(changes, list) or not changes:
+        return jsonify({'error': 'changes must be a non-empty list'}), 400
+    if len(changes) > MAX_BATCH_CELLS:
+        return jsonify({'error': f'At most {MAX_BATCH_CELLS} changes per request'}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
+    catalog = get_shift_catalog()
+    cursor.execute('SELECT id, emp_id FROM employees WHERE team_id = ? ORDER BY id DESC', (team_id,))
+    team_employee_ids = {row['emp_id']: row['id'] for row in cursor.fetchall()}
+    results = []
+    failed = False
+    try:
+        for change in changes:
+            change = change if isinstance(change, dict) else {}
+            emp_id = change.get('emp_id')
+            date = change.get('date')
+            shift = change.get('shift')
+            status = change.get('status')
+            result = {'emp_id': emp_id, 'date': date}
+            if not all([emp_id, date, shift, status]):
+                result['status'] = 'invalid'
+                result['error'] = 'emp_id, date, shift and status are required'
+            elif not all(isinstance(value, str) for value in (emp_id, shift, status)):
+                result['status'] = 'invalid'
+                result['error'] = 'emp_id, shift and status must be strings'
+            elif not is_roster_date(date):
+                result['status'] = 'invalid'
+                result['error'] = 'date must be in YYYY-MM-DD format'
+            elif emp_id not in team_employee_ids:
+                result['status'] = 'not_found'
+                result['error'] = 'Employee not found in team'
+            else:
+                cursor.execute(ROSTER_UPSERT_SQL, (team_employee_ids[emp_id], date, team_id)
+                               + catalog.encode(shift) + encode_status(status))
+                result['status'] = 'updated'
+            failed = failed or result['status'] != 'updated'
+            results.append(result)
+
+        if failed:
+            conn.rollback()
+        else:
+            conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        conn.close()
+        app.logger.error(f"Batch roster update failed: {e}")
+        return jsonify({'error': 'Failed to update roster'}), 500
+    conn.close()
+
+    if failed:
+        return jsonify({'error': 'No changes applied; some cells are invalid', 'results': results}), 400
+    return jsonify({'message': f'Updated {len(results)} roster entries', 'results': results}), 200
+
 @app.route('/api/roster/<emp_id>/<date>', methods=['GET'])
 @require_auth
 def get_roster_entry(emp_id, date):
@@ -1116,7 +3067,10 @@ def get_roster_entry(emp_id, date):
 
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT shift, status FROM roster WHERE emp_id = ? AND date = ? AND team_id = ?', (emp_id, date, team_id))
+    cursor.execute('''
+        SELECT shift, status FROM roster_cells
+        WHERE emp_id = ? AND date = ? AND team_id = ?
+    ''', (emp_id, date, team_id))
     entry = cursor.fetchone()
     conn.close()
     
@@ -1137,6 +3091,10 @@ def delete_employee_roster():
     
     if not all([emp_id, month, team_id]):
         return jsonify({'error': 'emp_id, month, and team_id are required'}), 400
+    try:
+        start_date, end_date = month_bounds(month)
+    except ValueError:
+        return jsonify({'error': 'month must be in YYYY-MM format'}), 400
     
     conn = get_db()
     cursor = conn.cursor()
@@ -1144,8 +3102,9 @@ def delete_employee_roster():
     # Delete all roster entries for this employee in the specified month
     cursor.execute('''
         DELETE FROM roster 
-        WHERE emp_id = ? AND team_id = ? AND strftime('%Y-%m', date) = ?
-    ''', (emp_id, team_id, month))
+        WHERE employee_id IN (SELECT id FROM employees WHERE emp_id = ? AND team_id = ?)
+          AND team_id = ? AND date >= ? AND date < ?
+    ''', (emp_id, team_id, team_id, start_date, end_date))
     
     conn.commit()
     deleted_count = cursor.rowcount
@@ -1153,10 +3112,438 @@ def delete_employee_roster():
     
     return jsonify({'message': f'Deleted {deleted_count} roster entries'}), 200
 
+# -------------------- CSV IMPORT --------------------
+# Employees and rosters can be imported from CSV in three layouts, told apart
+# by their header line:
+#   roster:     Employee Name,Employee ID,Date,Shift,Status   (roster.csv)
+#   export:     Emp ID,Date,Shift Code,Is/OFF                  (roster_export.csv)
+#   employees:  Employee ID,Employee Name
+# The file is read row by row and written in chunks, one transaction each,
+# so memory use does not depend on the file size. Unknown employees are
+# created from the roster and employees layouts; the export layout has no
+# names and reports them as errors instead.
+ROSTER_IMPORT_CHUNK_SIZE = 1000
+# Errors listed in the report; the rest are only counted
+ROSTER_IMPORT_MAX_ERRORS = 500
+
+IMPORT_FORMATS = {
+    'roster': ['Employee Name', 'Employee ID', 'Date', 'Shift', 'Status'],
+    'export': ['Emp ID', 'Date', 'Shift Code', 'Is/OFF'],
+    'employees': ['Employee ID', 'Employee Name'],
+}
+
+def parse_import_row(kind, row, catalog):
+    """Turn a CSV row into (emp_id, name, cell); cell is the roster part or None.
+
+    Raises ValueError with a message for the error report.
+    """
+    if len(row) != len(IMPORT_FORMATS[kind]):
+        raise ValueError(f'Expected {len(IMPORT_FORMATS[kind])} columns, got {len(row)}')
+    row = [value.strip() for value in row]
+    if kind == 'employees':
+        emp_id, name = row
+        if not emp_id or not name:
+            raise ValueError('Employee ID and name are required')
+        return emp_id, name, None
+
+    if kind == 'roster':
+        name, emp_id, date, shift, status = row
+        if not status:
+            raise ValueError('Status is required')
+        shift_id, shift_label = catalog.encode(shift or None)
+        status_code, status_label = encode_status(status)
+    else:
+        name = None
+        emp_id, date, shift_code, is_off = row
+        if is_off not in ('0', '1'):
+            raise ValueError('Is/OFF must be 0 or 1')
+        if is_off == '1':
+            # The code of an OFF row only repeats the last full-day shift
+            shift_id, shift_label, status_code, status_label = None, None, STATUS_OFF, None
+        elif not shift_code:
+            # Export rows for days without a roster entry
+            return emp_id, name, None
+        else:
+            shift_id = catalog.ids_by_code.get(shift_code)
+            if shift_id is None:
+                raise ValueError(f'Unknown shift code {shift_code}')
+            shift_label = None
+            status_code = STATUS_HALF_DAY if catalog.types[shift_id] == 'half' else STATUS_FULL_DAY
+            status_label = None
+    if not emp_id:
+        raise ValueError('Employee ID is required')
+    if not is_roster_date(date):
+        raise ValueError('Date must be in YYYY-MM-DD format')
+    return emp_id, name, (date, shift_id, shift_label, status_code, status_label)
+
+def import_csv(conn, team_id, lines, chunk_size=ROSTER_IMPORT_CHUNK_SIZE):
+    """Import CSV ``lines`` (any iterable of text lines) into a team's employees and roster.
+
+    Returns the report dict. Raises ValueError if the header matches no
+    known layout. Each chunk is committed on its own, so rows before a
+    failing write stay imported.
+    """
+    reader = csv.reader(lines)
+    header = [value.strip() for value in next(reader, [])]
+    kind = next((kind for kind, columns in IMPORT_FORMATS.items() if header == columns), None)
+    if kind is None:
+        raise ValueError('Unrecognised CSV header; expected one of: '
+                         + '; '.join(','.join(columns) for columns in IMPORT_FORMATS.values()))
+
+    cursor = conn.cursor()
+    catalog = get_shift_catalog()
+    cursor.execute('SELECT id, emp_id FROM employees WHERE team_id = ? ORDER BY id DESC', (team_id,))
+    team_employee_ids = {row['emp_id']: row['id'] for row in cursor.fetchall()}
+
+    report = {'format': kind, 'rows': 0, 'cells': 0, 'employees_created': 0, 'error_count': 0, 'errors': []}
+    new_employees = {}
+    cells = []
+
+    def error(line, emp_id, message):
+        report['error_count'] += 1
+        if len(report['errors']) < ROSTER_IMPORT_MAX_ERRORS:
+            report['errors'].append({'line': line, 'emp_id': emp_id, 'error': message})
+
+    def flush():
+        if new_employees:
+            cursor.executemany('INSERT INTO employees (emp_id, name, team_id) VALUES (?, ?, ?)',
+                               [(emp_id, name, team_id) for emp_id, name in new_employees.items()])
+            cursor.execute(f'''
+                SELECT id, emp_id FROM employees
+                WHERE team_id = ? AND emp_id IN ({', '.join('?' * len(new_employees))})
+            ''', (team_id, *new_employees))
+            team_employee_ids.update({row['emp_id']: row['id'] for row in cursor.fetchall()})
+        with deferred_roster_stats(conn, {team_employee_ids[emp_id] for emp_id, _ in cells}, len(cells)):
+            cursor.executemany(ROSTER_UPSERT_SQL, [
+                (team_employee_ids[emp_id], date, team_id, shift_id, shift_label, status_code, status_label)
+                for emp_id, (date, shift_id, shift_label, status_code, status_label) in cells
+            ])
+        conn.commit()
+        report['employees_created'] += len(new_employees)
+        report['cells'] += len(cells)
+        new_employees.clear()
+        cells.clear()
+
+    emp_column = header.index('Emp ID' if kind == 'export' else 'Employee ID')
+    for row in reader:
+        if not any(row):
+            continue
+        report['rows'] += 1
+        line = reader.line_num
+        try:
+            emp_id, name, cell = parse_import_row(kind, row, catalog)
+        except ValueError as e:
+            error(line, row[emp_column].strip() if len(row) > emp_column else None, str(e))
+            continue
+        if emp_id not in team_employee_ids and emp_id not in new_employees:
+            if name is None:
+                error(line, emp_id, 'Employee not found in team')
+                continue
+            new_employees[emp_id] = name
+        if cell is not None:
+            cells.append((emp_id, cell))
+        if len(cells) + len(new_employees) >= chunk_size:
+            flush()
+    flush()
+    return report
+
+@app.route('/api/import', methods=['POST'])
+@require_auth
+def import_roster_csv():
+    """Import a CSV upload (multipart ``file`` or a text/csv body) into a team.
+
+    Valid rows are saved in chunks and invalid ones are listed in ``errors``
+    with their line number.
+    """
+    team_id = request.args.get('team_id') or request.form.get('team_id')
+    user = get_current_user()
+    if user['role'] != 'super_admin':
+        team_id = user.get('team_id')
+    if not team_id:
+        return jsonify({'error': 'Team is required'}), 400
+
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    lines = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    conn = get_db()
+    try:
+        report = import_csv(conn, team_id, lines)
+    except UnicodeDecodeError:
+        # A ValueError subclass, so it has to come first
+        conn.close()
+        return jsonify({'error': 'CSV must be UTF-8 encoded'}), 400
+    except ValueError as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
+    except sqlite3.Error as e:
+        conn.close()
+        app.logger.error(f"CSV import failed: {e}")
+        return jsonify({'error': 'Failed to save import'}), 500
+    conn.close()
+    saved = report['cells'] or report['employees_created']
+    return jsonify(report), 200 if saved or not report['error_count'] else 400
+
+@app.cli.command('import-csv')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--team-id', type=int, required=True, help='Team to import into.')
+def import_csv_command(path, team_id):
+    """Import employees or roster rows from a CSV file."""
+    conn = connect_db()
+    try:
+        with open(path, encoding='utf-8-sig', newline='') as lines:
+            report = import_csv(conn, team_id, lines)
+    except UnicodeDecodeError:
+        raise SystemExit('CSV must be UTF-8 encoded')
+    except ValueError as e:
+        raise SystemExit(str(e))
+    finally:
+        conn.close()
+    for problem in report['errors']:
+        print(f"line {problem['line']}: {problem['emp_id'] or ''}: {problem['error']}")
+    print(f"{report['rows']} rows read, {report['cells']} roster cells saved, "
+          f"{report['employees_created']} employees created, {report['error_count']} errors")
+
+def iter_export_rows(conn, team_id, dates):
+    """Yield ``[emp_id, date, shift_code, is_off]`` export rows for a team.
+
+    Rows are produced in a single ordered pass over the team's roster. OFF days
+    carry forward the code of the employee's last full-day shift, seeded from
+    the latest full-day shift before the first exported date. The connection
+    is closed once the generator is exhausted or closed.
+    """
+    try:
+        if not dates:
+            return
+        cursor = conn.cursor()
+
+        catalog = get_shift_catalog()
+
+        # Last full-day shift code of every employee before the exported range
+        cursor.execute('''
+            SELECT employee_id, shift_id FROM (
+                SELECT employee_id, shift_id,
+                       ROW_NUMBER() OVER (PARTITION BY employee_id ORDER BY date DESC) AS rn
+                FROM roster
+                WHERE team_id = ? AND date < ? AND status_code = ?
+            )
+            WHERE rn = 1
+        ''', (team_id, dates[0], STATUS_FULL_DAY))
+        prev_full_codes = {row['employee_id']: catalog.code(row['shift_id']) for row in cursor.fetchall()}
+
+        cursor.execute('SELECT id, emp_id FROM employees WHERE team_id = ? ORDER BY name, id', (team_id,))
+        employees = cursor.fetchall()
+
+        # All cells of the range, in the same employee order as above
+        cursor.execute('''
+            SELECT e.id AS employee_row, r.date, r.shift_id, r.status_code, r.status_label
+            FROM employees e
+            JOIN roster r ON r.employee_id = e.id AND r.team_id = e.team_id
+            WHERE e.team_id = ? AND r.date >= ? AND r.date <= ?
+            ORDER BY e.name, e.id, r.date
+        ''', (team_id, dates[0], dates[-1]))
+        cell_groups = groupby(cursor, key=lambda row: row['employee_row'])
+        pending = next(cell_groups, None)
+
+        for employee in employees:
+            emp_id_val = employee['emp_id']
+            emp_cells = {}
+            if pending is not None and pending[0] == employee['id']:
+                emp_cells = {row['date']: (row['shift_id'], decode_status(row['status_code'], row['status_label']))
+                             for row in pending[1]}
+                pending = next(cell_groups, None)
+
+            last_full_shift_code = prev_full_codes.get(employee['id'], '')
+            for date in dates:
+                result = emp_cells.get(date)
+                if not result:
+                    # No roster entry: shift code blank, not off
+                    yield [emp_id_val, date, '', 0]
+                    continue
+
+                status = (result[1] or '').upper()
+                if status == 'FULL DAY':
+                    shift_code_val = catalog.code(result[0])
+                    # Update last full-day shift code tracker
+                    last_full_shift_code = shift_code_val or last_full_shift_code
+                    is_off = 0
+                elif status == 'OFF':
+                    shift_code_val = last_full_shift_code
+                    is_off = 1
+                else:
+                    # Half Day or other statuses
+                    shift_code_val = catalog.code(result[0])
+                    is_off = 0
+                yield [emp_id_val, date, shift_code_val, is_off]
+    finally:
+        conn.close()
+
+def stream_csv(header, rows, chunk_size=64 * 1024):
+    """Encode rows as CSV text chunks, sending the header line right away."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def stream_gzip(chunks, level=6):
+    """Gzip-compress a stream of text chunks as they are produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_ndjson(fields, rows, chunk_size=64 * 1024):
+    """One JSON object per line, keyed by ``fields``"""
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(fields, row)), separators=(',', ':')) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines)
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable file that hands what zipfile writes to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Roster" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+def xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{xml_escape(str(value))}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+def stream_xlsx(header, rows, chunk_size=64 * 1024):
+    """A single-sheet XLSX workbook written as the rows arrive.
+
+    Cells use inline strings, so there is no shared-string table to hold
+    in memory, and zipfile writes the sheet with data descriptors because
+    the sink cannot seek.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in XLSX_PARTS.items():
+            archive.writestr(name, xml)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetData>' + xlsx_row(header)).encode())
+            for row in rows:
+                sheet.write(xlsx_row(row).encode())
+                if sink.size >= chunk_size:
+                    yield sink.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.take()
+
+# format -> (mimetype, file extension); all are built from iter_export_rows()
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+EXPORT_HEADER = ['Emp ID', 'Date', 'Shift Code', 'Is/OFF']
+EXPORT_FIELDS = ['emp_id', 'date', 'shift_code', 'is_off']
+
+def export_format():
+    """Format named by ``?format=``, else the best match for the Accept header"""
+    name = request.args.get('format')
+    if name:
+        return name if name in EXPORT_FORMATS else None
+    by_mimetype = {mimetype: name for name, (mimetype, _) in EXPORT_FORMATS.items()}
+    return by_mimetype.get(request.accept_mimetypes.best_match(list(by_mimetype)), 'csv')
+
+def stream_export(file_format, rows):
+    if file_format == 'csv.gz':
+        return stream_gzip(stream_csv(EXPORT_HEADER, rows))
+    if file_format == 'ndjson':
+        return stream_ndjson(EXPORT_FIELDS, rows)
+    if file_format == 'xlsx':
+        return stream_xlsx(EXPORT_HEADER, rows)
+    return stream_csv(EXPORT_HEADER, rows)
+
 @app.route('/api/roster/export', methods=['GET'])
 @require_auth
 def export_roster():
+    """Stream a team's roster as CSV, gzip CSV, NDJSON or XLSX.
+
+    The format comes from ``?format=`` (``csv``, ``csv.gz``, ``ndjson``,
+    ``xlsx``) or the Accept header and defaults to CSV.
+    """
     month_filter = request.args.get('month')  # Format: YYYY-MM
+    file_format = export_format()
+    if file_format is None:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
     show_all = request.args.get('all') == 'true'
     team_filter = request.args.get('team_id')
     user = get_current_user()
@@ -1167,150 +3554,452 @@ def export_roster():
     
     conn = get_db()
     cursor = conn.cursor()
+
+    versions = fetch_roster_versions(cursor, team_filter)
+    # The format may come from the Accept header, which the query does not show
+    etag = roster_etag(team_filter, versions, file_format)
+    if etag in request.if_none_match:
+        conn.close()
+        response = not_modified(etag)
+        response.vary.add('Accept')
+        return response
     
-    # Get dates based on filter (same logic as get_roster)
+    try:
+        dates = fetch_roster_dates(cursor, team_filter, month_filter, show_all)
+    except ValueError:
+        conn.close()
+        return jsonify({'error': 'month must be in YYYY-MM format'}), 400
+
+    # A finished export job for the same data is sent as is
+    if dates and file_format == 'csv':
+        export_filter = 'all' if show_all else dates[0][:7]
+        path = export_artifact_path(team_filter, export_filter, versions)
+        if os.path.exists(path):
+            conn.close()
+            response = with_etag(send_file(path, mimetype='text/csv', as_attachment=True,
+                                           download_name='roster_export.csv'), etag)
+            response.vary.add('Accept')
+            return response
+
+    # Required columns:
+    # 1: Emp ID
+    # 2: Date (YYYY-MM-DD)
+    # 3: Shift Code
+    # 4: Is/OFF (1 if OFF else 0)
+    rows = iter_export_rows(conn, team_filter, dates)
+    mimetype, extension = EXPORT_FORMATS[file_format]
+    response = with_etag(Response(
+        stream_with_context(stream_export(file_format, rows)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=roster_export.{extension}'}
+    ), etag)
+    response.vary.add('Accept')
+    return response
+
+# -------------------- EXPORT JOBS --------------------
+# Exports too large for one request run as jobs in a per-worker thread pool.
+# Job rows live in the database so any worker can answer status and download
+# requests. Finished files are named after the team, the filter (a month or
+# "all") and the data versions they were read at, so a request for an
+# unchanged roster finds the file already there, and an edit makes the next
+# request build a new one. Older files of the same team and filter are
+# removed when a new one is written.
+EXPORT_DIR = os.getenv('EXPORT_DIR', 'exports')
+EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', '2'))
+# Queued or running jobs older than this are assumed lost with their worker
+EXPORT_JOB_TIMEOUT = 3600
+EXPORT_JOB_RETENTION = 7 * 24 * 3600
+
+_export_executor = None
+_export_pid = None
+_export_lock = threading.Lock()
+
+def export_artifact_path(team_id, export_filter, versions):
+    return os.path.join(EXPORT_DIR, f"roster-{int(team_id)}-{export_filter}-v{versions[0]}-s{versions[1]}.csv")
+
+def export_job_dict(row):
+    job = {key: row[key] for key in ('id', 'team_id', 'filter', 'status', 'rows', 'error',
+                                     'created_at', 'finished_at')}
+    if row['status'] == 'done':
+        job['download_url'] = f"/api/roster/export/jobs/{row['id']}/download"
+    return job
+
+def update_export_job(job_id, **fields):
+    conn = connect_db()
+    try:
+        assignments = ', '.join(f'{field} = ?' for field in fields)
+        conn.execute(f'UPDATE export_jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+def write_export_artifact(team_id, export_filter):
+    """Write the export file for the current data; returns (path, row count)"""
+    count = 0
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    conn = connect_db()
+    temp_path = None
+    try:
+        # One read transaction, so the versions in the name match the rows
+        conn.execute('BEGIN')
+        cursor = conn.cursor()
+        path = export_artifact_path(team_id, export_filter, fetch_roster_versions(cursor, team_id))
+        if export_filter == 'all':
+            dates = fetch_roster_dates(cursor, team_id, show_all=True)
+        else:
+            dates = fetch_roster_dates(cursor, team_id, export_filter)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', newline='') as f:
+            for chunk in stream_csv(EXPORT_HEADER, counted(iter_export_rows(conn, team_id, dates))):
+                f.write(chunk)
+        os.replace(temp_path, path)
+    finally:
+        conn.close()
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    prefix = f"roster-{int(team_id)}-{export_filter}-v"
+    for name in os.listdir(EXPORT_DIR):
+        if name.startswith(prefix) and name.endswith('.csv') and name != os.path.basename(path):
+            try:
+                os.remove(os.path.join(EXPORT_DIR, name))
+            except FileNotFoundError:
+                pass
+    return path, count
+
+def run_export_job(job_id, team_id, export_filter):
+    update_export_job(job_id, status='running')
+    try:
+        path, count = write_export_artifact(team_id, export_filter)
+    except Exception as e:
+        app.logger.error(f"Export job {job_id} failed: {e}")
+        update_export_job(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+        return
+    update_export_job(job_id, status='done', artifact=os.path.basename(path), rows=count,
+                      finished_at=datetime.now().isoformat())
+
+def submit_export_job(job_id, team_id, export_filter):
+    global _export_executor, _export_pid
+    with _export_lock:
+        if _export_pid != os.getpid():
+            # Pool threads do not survive a fork
+            _export_executor = ThreadPoolExecutor(max_workers=EXPORT_JOB_WORKERS, thread_name_prefix='export-job')
+            _export_pid = os.getpid()
+        _export_executor.submit(run_export_job, job_id, team_id, export_filter)
+
+@app.route('/api/roster/export/jobs', methods=['POST'])
+@require_auth
+def create_export_job():
+    """Start a background export; the job is done at once if the file exists.
+
+    Body (or query): ``team_id`` and ``month`` (YYYY-MM) or ``all``; without
+    either, the team's latest month. A job for the same export that is
+    still queued or running is returned instead of starting another.
+    """
+    data = request.get_json(silent=True) or {}
+    month_filter = data.get('month') or request.args.get('month')
+    show_all = data.get('all') in (True, 'true') or request.args.get('all') == 'true'
+    team_filter = data.get('team_id') or request.args.get('team_id')
+    user = get_current_user()
+    if user['role'] != 'super_admin':
+        team_filter = user.get('team_id')
+    if not team_filter:
+        return jsonify({'error': 'Team is required'}), 400
+    try:
+        team_filter = int(team_filter)
+        if month_filter and not show_all:
+            month_bounds(month_filter)
+    except ValueError:
+        return jsonify({'error': 'team_id must be an integer and month in YYYY-MM format'}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
     if show_all:
-        cursor.execute('SELECT DISTINCT date FROM roster WHERE team_id = ? ORDER BY date DESC', (team_filter,))
+        export_filter = 'all'
     elif month_filter:
-        cursor.execute('''
-            SELECT DISTINCT date FROM roster 
-            WHERE date LIKE ? AND team_id = ?
-            ORDER BY date
-        ''', (f"{month_filter}%", team_filter))
+        export_filter = month_filter
     else:
-        # Default: show last month's roster
-        cursor.execute('''
-            SELECT DISTINCT date FROM roster 
-            WHERE team_id = ? AND strftime('%Y-%m', date) = (
-                SELECT strftime('%Y-%m', MAX(date)) FROM roster WHERE team_id = ?
-            )
-            ORDER BY date
-        ''', (team_filter, team_filter))
-    
-    dates = [row['date'] for row in cursor.fetchall()]
-    
-    # Get all employees
-    cursor.execute('SELECT emp_id, name FROM employees WHERE team_id = ? ORDER BY name', (team_filter,))
-    employees = cursor.fetchall()
-    
-    # Build a mapping from display text to shift CODE for lookups
-    # Display format stored in roster is: "<shift_name> (<shift_code>)"
-    cursor.execute('SELECT id, shift_name, shift_code FROM shifts')
-    shift_rows = cursor.fetchall()
-    shift_display_to_code = {
-        f"{row['shift_name']} ({row['shift_code']})": row['shift_code'] for row in shift_rows
-    }
+        latest = latest_roster_date(cursor, team_filter)
+        if not latest:
+            conn.close()
+            return jsonify({'error': 'Team has no roster data'}), 404
+        export_filter = latest[:7]
+
+    path = export_artifact_path(team_filter, export_filter, fetch_roster_versions(cursor, team_filter))
+    artifact = os.path.basename(path)
+    now = datetime.now()
+    cursor.execute('DELETE FROM export_jobs WHERE created_at < ?',
+                   ((now - timedelta(seconds=EXPORT_JOB_RETENTION)).isoformat(),))
+    cursor.execute('''
+        SELECT * FROM export_jobs
+        WHERE artifact = ? AND created_at >= ? AND status IN ('queued', 'running', 'done')
+        ORDER BY created_at DESC LIMIT 1
+    ''', (artifact, (now - timedelta(seconds=EXPORT_JOB_TIMEOUT)).isoformat()))
+    existing = cursor.fetchone()
+    if existing and (existing['status'] != 'done' or os.path.exists(path)):
+        conn.commit()
+        conn.close()
+        return jsonify(export_job_dict(existing)), 200 if existing['status'] == 'done' else 202
 
-    filename = 'roster_export.csv'
-    with open(filename, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        # Required columns:
-        # 1: Emp ID
-        # 2: Date (YYYY-MM-DD)
-        # 3: Shift Code
-        # 4: Is/OFF (1 if OFF else 0)
-        writer.writerow(['Emp ID', 'Date', 'Shift Code', 'Is/OFF'])
-        
-        # Export data for all employees and all dates in filter
-        if not dates:
-            pass
-        else:
-            # Ensure ascending order and compute context start
-            dates_sorted = sorted(dates)
-            min_date = dates_sorted[0]
-
-            for employee in employees:
-                # Initialize last full-day shift code with history before range
-                cursor.execute('''
-                    SELECT shift FROM roster 
-                    WHERE emp_id = ? AND date < ? AND status = 'Full Day' AND team_id = ?
-                    ORDER BY date DESC LIMIT 1
-                ''', (employee['emp_id'], min_date, team_filter))
-                prev_full = cursor.fetchone()
-                last_full_shift_code = ''
-                if prev_full and prev_full['shift']:
-                    last_full_shift_code = shift_display_to_code.get(prev_full['shift'], '')
-
-                for date in dates_sorted:
-                    cursor.execute('''
-                        SELECT shift, status 
-                        FROM roster 
-                        WHERE emp_id = ? AND date = ? AND team_id = ?
-                    ''', (employee['emp_id'], date, team_filter))
-                    result = cursor.fetchone()
-                    
-                    emp_id_val = employee['emp_id']
-                    date_val = date
-
-                    if result:
-                        status = (result['status'] or '').upper()
-                        shift_text = result['shift'] or ''
-
-                        if status == 'FULL DAY':
-                            shift_code_val = shift_display_to_code.get(shift_text, '')
-                            # Update last full-day shift code tracker
-                            last_full_shift_code = shift_code_val or last_full_shift_code
-                            is_off = 0
-                        elif status == 'OFF':
-                            shift_code_val = last_full_shift_code
-                            is_off = 1
-                        else:
-                            # Half Day or other statuses
-                            shift_code_val = shift_display_to_code.get(shift_text, '')
-                            is_off = 0
-
-                        writer.writerow([
-                            emp_id_val,
-                            date_val,
-                            shift_code_val,
-                            is_off
-                        ])
-                    else:
-                        # No roster entry: shift code blank, not off
-                        writer.writerow([
-                            emp_id_val,
-                            date_val,
-                            '',
-                            0
-                        ])
-    
+    job_id = secrets.token_urlsafe(16)
+    cached = os.path.exists(path)
+    cursor.execute('''
+        INSERT INTO export_jobs (id, team_id, filter, artifact, status, created_by, created_at, finished_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (job_id, team_filter, export_filter, artifact, 'done' if cached else 'queued', user['username'],
+          now.isoformat(), now.isoformat() if cached else None))
+    conn.commit()
+    cursor.execute('SELECT * FROM export_jobs WHERE id = ?', (job_id,))
+    job = export_job_dict(cursor.fetchone())
     conn.close()
-    return send_file(filename, as_attachment=True, download_name='roster_export.csv')
+    if cached:
+        return jsonify(job), 200
+    submit_export_job(job_id, team_filter, export_filter)
+    return jsonify(job), 202
+
+def fetch_export_job(job_id):
+    """The job row if it exists and the current user may see it, else None"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM export_jobs WHERE id = ?', (job_id,))
+    job = cursor.fetchone()
+    conn.close()
+    user = get_current_user()
+    if job and user['role'] != 'super_admin' and str(job['team_id']) != str(user.get('team_id')):
+        return None
+    return job
+
+@app.route('/api/roster/export/jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_export_job(job_id):
+    job = fetch_export_job(job_id)
+    if not job:
+        return jsonify({'error': 'Export job not found'}), 404
+    return jsonify(export_job_dict(job)), 200
+
+@app.route('/api/roster/export/jobs/<job_id>/download', methods=['GET'])
+@require_auth
+def download_export_job(job_id):
+    job = fetch_export_job(job_id)
+    if not job:
+        return jsonify({'error': 'Export job not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'error': 'Export job is not finished', 'status': job['status']}), 409
+    if job['artifact'] in request.if_none_match:
+        return not_modified(job['artifact'])
+    path = os.path.join(EXPORT_DIR, job['artifact'])
+    if not os.path.exists(path):
+        # Replaced by a newer export of the same roster
+        return jsonify({'error': 'Export file has expired; start a new job'}), 410
+    response = send_file(path, mimetype='text/csv', as_attachment=True,
+                         download_name=f"roster_export_{job['team_id']}_{job['filter']}.csv")
+    return with_etag(response, job['artifact']), 200
+
+# -------------------- ORG-WIDE EXPORT --------------------
+# Every team's export in one zip. Team files are the same cached artifacts
+# the export jobs write. Building one is mostly Python (CSV formatting and
+# row assembly) rather than SQLite work, so missing or outdated files are
+# written by a process pool sized to the machine; the wait grows with teams
+# per core rather than with the number of teams. This process only opens the
+# finished files and streams them into the zip in team order, followed by a
+# manifest with row counts and checksums.
+ORG_EXPORT_WORKERS = int(os.getenv('ORG_EXPORT_WORKERS', str(os.cpu_count() or 2)))
+
+_org_export_pool = None
+_org_export_pid = None
+_org_export_lock = threading.Lock()
+
+def build_export_artifact(database, export_dir, team_id, export_filter):
+    """write_export_artifact in a pool process, which has its own settings"""
+    global DATABASE, EXPORT_DIR
+    DATABASE, EXPORT_DIR = database, export_dir
+    return write_export_artifact(team_id, export_filter)
+
+def org_export_pool():
+    global _org_export_pool, _org_export_pid
+    with _org_export_lock:
+        if _org_export_pid != os.getpid():
+            # Spawned, not forked: the web worker has threads holding locks
+            _org_export_pool = ProcessPoolExecutor(max_workers=max(1, ORG_EXPORT_WORKERS),
+                                                   mp_context=multiprocessing.get_context('spawn'))
+            _org_export_pid = os.getpid()
+        return _org_export_pool
+
+def current_export_artifact(team_id, export_filter):
+    """Path of the team's export for the current data, or None if not written"""
+    conn = connect_db()
+    try:
+        path = export_artifact_path(team_id, export_filter, fetch_roster_versions(conn.cursor(), team_id))
+    finally:
+        conn.close()
+    return path if os.path.exists(path) else None
+
+def submit_export_artifact(team_id, export_filter):
+    return org_export_pool().submit(build_export_artifact, DATABASE, EXPORT_DIR, team_id, export_filter)
+
+def open_export_artifact(team_id, export_filter, pending=None):
+    """Open the team's export file, waiting for ``pending`` or a new build if needed"""
+    for _ in range(3):
+        if pending is not None:
+            path, _ = pending.result()
+            pending = None
+        else:
+            path = current_export_artifact(team_id, export_filter)
+        if path is None:
+            pending = submit_export_artifact(team_id, export_filter)
+            continue
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            continue  # replaced by a newer export in the meantime
+    raise RuntimeError(f'Export of team {team_id} kept changing')
+
+def stream_org_export(teams, export_filter, chunk_size=64 * 1024):
+    """Zip of every team's export CSV plus manifest.json"""
+    sink = _ZipSink()
+    manifest = {'filter': export_filter, 'generated_at': datetime.now().isoformat(), 'teams': []}
+    # Start every missing file before streaming the first one
+    pending = {}
+    for team in teams:
+        if current_export_artifact(team['id'], export_filter) is None:
+            pending[team['id']] = submit_export_artifact(team['id'], export_filter)
+    try:
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for team in teams:
+                name = f"{team['id']}-{re.sub(r'[^A-Za-z0-9_-]+', '_', team['name'] or '')}.csv"
+                digest = hashlib.sha256()
+                size = lines = 0
+                source = open_export_artifact(team['id'], export_filter, pending.pop(team['id'], None))
+                with source, archive.open(name, 'w', force_zip64=True) as target:
+                    for block in iter(lambda: source.read(chunk_size), b''):
+                        target.write(block)
+                        digest.update(block)
+                        size += len(block)
+                        lines += block.count(b'\n')
+                        if sink.size >= chunk_size:
+                            yield sink.take()
+                manifest['teams'].append({
+                    'team_id': team['id'], 'team_name': team['name'], 'file': name,
+                    'rows': max(lines - 1, 0), 'bytes': size, 'sha256': digest.hexdigest()
+                })
+            archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+        yield sink.take()
+    finally:
+        # Builds for teams the client disconnected before still finish and stay cached
+        for future in pending.values():
+            future.cancel()
+
+@app.route('/api/roster/export/org', methods=['GET'])
+@require_role(['super_admin'])
+def export_org_roster():
+    """Zip with the ``month`` (YYYY-MM) or ``all=true`` export of every team"""
+    month_filter = request.args.get('month')
+    show_all = request.args.get('all') == 'true'
+    if show_all:
+        export_filter = 'all'
+    else:
+        try:
+            month_bounds(month_filter or '')
+        except ValueError:
+            return jsonify({'error': 'month (YYYY-MM) or all=true is required'}), 400
+        export_filter = month_filter
+
+    teams = cached_reference('teams', TEAMS_SCOPE, load_teams)
+    return Response(
+        stream_org_export(teams, export_filter),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename=roster_export_{export_filter}.zip'}
+    )
 
 # ==================== STATS ENDPOINT ====================
 
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the /api/stats summary tables."""
+    conn = connect_db()
+    try:
+        with conn:
+            rebuild_stats(conn.cursor())
+    finally:
+        conn.close()
+    print("Rebuilt stats summary tables")
+
+@app.cli.command('check-stats')
+def check_stats_command():
+    """Verify the /api/stats summary tables against the roster."""
+    conn = connect_db()
+    try:
+        problems = check_stats(conn.cursor())
+    finally:
+        conn.close()
+    for problem in problems:
+        print(problem)
+    if problems:
+        raise SystemExit(f"{len(problems)} stats rows out of date; run 'flask --app api rebuild-stats'")
+    print("Stats summary tables are consistent")
+
 @app.route('/api/stats', methods=['GET'])
 @require_auth
 def get_stats():
     team_filter = request.args.get('team_id')
+    month = request.args.get('month')
     user = get_current_user()
     if user['role'] != 'super_admin':
         team_filter = user.get('team_id')
+    if month:
+        try:
+            month_bounds(month)
+        except ValueError:
+            return jsonify({'error': 'month must be YYYY-MM'}), 400
 
     conn = get_db()
     cursor = conn.cursor()
     
+    # Counts come from the trigger-maintained summary tables (migration 11)
     if team_filter:
-        cursor.execute('SELECT COUNT(*) as count FROM employees WHERE team_id = ?', (team_filter,))
-        employee_count = dict(cursor.fetchone())['count']
-        cursor.execute('SELECT COUNT(DISTINCT emp_id) as count FROM roster WHERE team_id = ?', (team_filter,))
-        rostered_employees = dict(cursor.fetchone())['count']
+        cursor.execute('SELECT employee_count, rostered_count FROM team_stats WHERE team_id = ?', (team_filter,))
+        row = cursor.fetchone()
+        employee_count, rostered_employees = (row['employee_count'], row['rostered_count']) if row else (0, 0)
     else:
-        cursor.execute('SELECT COUNT(*) as count FROM employees')
-        employee_count = dict(cursor.fetchone())['count']
-        cursor.execute('SELECT COUNT(DISTINCT emp_id) as count FROM roster')
-        rostered_employees = dict(cursor.fetchone())['count']
+        cursor.execute('SELECT IFNULL(SUM(employee_count), 0) AS count FROM team_stats')
+        employee_count = cursor.fetchone()['count']
+        cursor.execute('SELECT COUNT(DISTINCT employee_id) AS count FROM roster_employee_cells')
+        rostered_employees = cursor.fetchone()['count']
 
-    cursor.execute('SELECT COUNT(*) as count FROM shifts')
-    shift_count = dict(cursor.fetchone())['count']
-    
-    conn.close()
-    
-    return jsonify({
+    shift_count = len(cached_reference('shifts', SHIFTS_SCOPE, load_shifts))
+
+    stats = {
         'total_employees': employee_count,
         'total_shifts': shift_count,
         'rostered_employees': rostered_employees
-    }), 200
+    }
+    if month:
+        # Free-text statuses are stored with status_code NULL and counted as 'Other'
+        if team_filter:
+            cursor.execute('''
+                SELECT status_code, cells FROM roster_month_status WHERE team_id = ? AND month = ?
+            ''', (team_filter, month))
+        else:
+            cursor.execute('''
+                SELECT status_code, SUM(cells) AS cells FROM roster_month_status
+                WHERE month = ? GROUP BY status_code
+            ''', (month,))
+        status_counts = {name: 0 for name in STATUS_CODES}
+        status_counts['Other'] = 0
+        for row in cursor.fetchall():
+            status_counts[STATUS_NAMES.get(row['status_code'], 'Other')] += row['cells']
+        stats['month'] = month
+        stats['status_counts'] = status_counts
+
+    conn.close()
+    
+    return jsonify(stats), 200
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
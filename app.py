@@ -173,15 +173,8 @@ def create_roster():
         # Get default shift details
         conn = sqlite3.connect('database.db')
         cursor = conn.cursor()
-        cursor.execute('SELECT shift_name, shift_code FROM shifts WHERE id = ?', (default_shift_id,))
+        cursor.execute('SELECT id FROM shifts WHERE id = ?', (default_shift_id,))
         default_shift = cursor.fetchone()
-        default_shift_display = f"{default_shift[0]} ({default_shift[1]})" if default_shift else ''
-
-        # Get half shift details
-        half_shift_details = {}
-        for shift_id in half_shifts:
-            cursor.execute('SELECT shift_name, shift_code FROM shifts WHERE id = ?', (shift_id,))
-            half_shift_details[shift_id] = cursor.fetchone()
 
         # Generate all dates
         start_date = datetime.strptime(f"{month}-01", '%Y-%m-%d')
@@ -190,25 +183,30 @@ def create_roster():
         all_dates = [(start_date + timedelta(days=i)).strftime('%Y-%m-%d')
                      for i in range((end_date - start_date).days + 1)]
 
-        # Insert roster entries
+        # Insert roster entries (status codes: 1 Full Day, 2 Half Day, 3 OFF)
         for date in all_dates:
-            status = 'Full Day'
-            shift_display = default_shift_display
+            status_code = 1
+            shift_id = default_shift[0] if default_shift else None
+            shift_label = None if default_shift else ''
 
             if date in off_dates:
-                status = 'OFF'
-                shift_display = 'N/A'
+                status_code = 3
+                shift_id = None
+                shift_label = None
             elif date in half_dates:
-                status = 'Half Day'
+                status_code = 2
                 idx = half_dates.index(date)
                 shift_id = half_shifts[idx]
-                shift = half_shift_details.get(shift_id, ('N/A', 'N/A'))
-                shift_display = f"{shift[0]} ({shift[1]})"
+                shift_label = None
 
+            # Resubmitting a month overwrites it instead of adding a second copy
             cursor.execute('''
-                INSERT INTO roster (emp_id, date, shift, status)
-                VALUES (?, ?, ?, ?)
-            ''', (emp_id, date, shift_display, status))
+                INSERT INTO roster (employee_id, date, shift_id, shift_label, status_code)
+                VALUES ((SELECT MIN(id) FROM employees WHERE emp_id = ?), ?, ?, ?, ?)
+                ON CONFLICT (employee_id, date) DO UPDATE SET
+                    shift_id = excluded.shift_id, shift_label = excluded.shift_label,
+                    status_code = excluded.status_code, status_label = NULL
+            ''', (emp_id, date, shift_id, shift_label, status_code))
 
         conn.commit()
         conn.close()
@@ -256,8 +254,8 @@ def roster_view():
         row = [emp_id, emp_name]  # Separate columns for ID and Name
         for date in dates:
             cursor.execute('''
-                SELECT shift || ' (' || status || ')' 
-                FROM roster 
+                SELECT shift || ' (' || status || ')'
+                FROM roster_cells
                 WHERE emp_id = ? AND date = ?
             ''', (emp_id, date))
             result = cursor.fetchone()
@@ -277,8 +275,8 @@ def export_roster():
     cursor = conn.cursor()
     cursor.execute('''
         SELECT e.name, r.emp_id, r.date, r.shift, r.status 
-        FROM roster r
-        JOIN employees e ON r.emp_id = e.emp_id
+        FROM roster_cells r
+        JOIN employees e ON e.id = r.employee_id
         ORDER BY e.name, r.date
     ''')
     rows = cursor.fetchall()
@@ -305,10 +303,14 @@ def edit_shift(emp_id, date):
         new_shift = request.form['shift']
         new_status = request.form['status']
 
+        # Roster stores shift ids and status codes; see roster_cells in api.py
         cursor.execute('''
-            UPDATE roster 
-            SET shift = ?, status = ?
-            WHERE emp_id = ? AND date = ?
+            UPDATE roster
+            SET shift_id = (SELECT id FROM shifts WHERE shift_name || ' (' || shift_code || ')' = ?),
+                shift_label = NULL,
+                status_code = CASE ? WHEN 'Full Day' THEN 1 WHEN 'Half Day' THEN 2 WHEN 'OFF' THEN 3 END,
+                status_label = NULL
+            WHERE employee_id IN (SELECT id FROM employees WHERE emp_id = ?) AND date = ?
         ''', (new_shift, new_status, emp_id, date))
 
         conn.commit()
@@ -317,8 +319,8 @@ def edit_shift(emp_id, date):
 
     # Get current shift data
     cursor.execute('''
-        SELECT shift, status 
-        FROM roster 
+        SELECT shift, status
+        FROM roster_cells
         WHERE emp_id = ? AND date = ?
     ''', (emp_id, date))
     current_data = cursor.fetchone()
@@ -371,13 +373,10 @@ def edit_employee(emp_id):
             return {'error': 'Employee ID already exists. Please choose a unique ID.'}, 400
 
         try:
-            # Update the employee record
+            # Roster rows reference employees.id, so only the employee changes
             cursor.execute('UPDATE employees SET emp_id = ?, name = ? WHERE emp_id = ?',
                            (new_emp_id, new_name, emp_id))
 
-            # Update all related records in the roster table
-            cursor.execute('UPDATE roster SET emp_id = ? WHERE emp_id = ?', (new_emp_id, emp_id))
-
             conn.commit()
         except sqlite3.IntegrityError:
             conn.close()
@@ -104,9 +104,30 @@ export const shiftAPI = {
 export const rosterAPI = {
   get: (params = {}) => api.get('/roster', { params }),
   create: (data) => api.post('/roster', data),
+  createBulk: (data) => api.post('/roster/bulk', data),
   update: (empId, date, data) => api.put(`/roster/${empId}/${date}`, data),
+  updateMany: (changes, teamId) => api.patch('/roster', { changes, team_id: teamId }),
   getEntry: (empId, date, params = {}) => api.get(`/roster/${empId}/${date}`, { params }),
+  getChanges: (params = {}) => api.get('/roster/changes', { params }),
+  getAnalytics: (params = {}) => api.get('/roster/analytics', { params }),
+  // EventSource cannot send headers, so it authenticates with a single-use
+  // ticket; call stream() again for a fresh ticket after the source errors
+  stream: async (params = {}) => {
+    const { data } = await api.post('/roster/stream/ticket');
+    return new EventSource(`${API_BASE_URL}/roster/stream?${new URLSearchParams({
+      ...params, ticket: data.ticket
+    })}`);
+  },
   export: (params = {}) => api.get('/roster/export', { params, responseType: 'blob' }),
+  exportOrg: (params = {}) => api.get('/roster/export/org', { params, responseType: 'blob' }),
+  createExportJob: (data) => api.post('/roster/export/jobs', data),
+  getExportJob: (jobId) => api.get(`/roster/export/jobs/${jobId}`),
+  downloadExportJob: (jobId) => api.get(`/roster/export/jobs/${jobId}/download`, { responseType: 'blob' }),
+  importCsv: (file, teamId) => {
+    const form = new FormData();
+    form.append('file', file);
+    return api.post('/import', form, { params: teamId ? { team_id: teamId } : {} });
+  },
   deleteEmployeeRoster: (empId, month, teamId) => api.delete('/roster/employee', { 
     params: { emp_id: empId, month: month, team_id: teamId } 
   }),
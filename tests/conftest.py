@@ -0,0 +1,81 @@
+"""Every test runs against a freshly migrated and seeded database in a temp dir."""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# api.py migrates and seeds ./database.db when imported; keep that out of the checkout
+os.chdir(tempfile.mkdtemp(prefix='rms-tests-'))
+os.environ.setdefault('SESSION_MAINTENANCE_INTERVAL', '0')
+
+import api  # noqa: E402
+
+SUPER_ADMIN = {'username': 'super_admin', 'password': 'admin123'}
+
+
+def reset_worker_state():
+    """Drop connections and caches that still point at the previous database"""
+    while not api._db_pool.empty():
+        api._db_pool.get_nowait().really_close()
+    with api._reference_lock:
+        if api._reference_conn is not None:
+            api._reference_conn.close()
+        api._reference_conn = None
+        api._reference_pid = None
+        api._reference_cache.clear()
+    api._analytics_cache.clear()
+    api.invalidate_auth_cache()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """The api module bound to an empty, migrated database"""
+    monkeypatch.setattr(api, 'DATABASE', str(tmp_path / 'database.db'))
+    monkeypatch.setattr(api, 'EXPORT_DIR', str(tmp_path / 'exports'))
+    reset_worker_state()
+    api.run_migrations(api.DATABASE)
+    api.seed_initial_data()
+    yield api
+    reset_worker_state()
+
+
+@pytest.fixture
+def client(db):
+    return db.app.test_client()
+
+
+@pytest.fixture
+def auth(client):
+    """Authorization headers of the seeded super admin"""
+    token = client.post('/api/login', json=SUPER_ADMIN).get_json()['token']
+    return {'Authorization': token}
+
+
+def add_shifts(conn):
+    """A full-day and a half-day shift; returns their ids"""
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO shifts (shift_name, shift_code, duration, type) VALUES ('Morning', '1001', 8, 'full')")
+    full_id = cursor.lastrowid
+    cursor.execute("INSERT INTO shifts (shift_name, shift_code, duration, type) VALUES ('Short', '2001', 4, 'half')")
+    half_id = cursor.lastrowid
+    conn.commit()
+    return full_id, half_id
+
+
+def add_team_roster(conn, team_id, count, month, full_id, half_id, start=0):
+    """Employees E<n> with a month of Full Day / Half Day / OFF cells each"""
+    cursor = conn.cursor()
+    for n in range(start, start + count):
+        cursor.execute('INSERT INTO employees (emp_id, name, team_id) VALUES (?, ?, ?)',
+                       (f'E{n:04d}', f'Employee {n:04d}', team_id))
+        employee_id = cursor.lastrowid
+        rows = api.build_month_rows(api.month_dates(month), full_id,
+                                    [f'{month}-07'], {f'{month}-03': half_id})
+        cursor.executemany(api.ROSTER_UPSERT_SQL, [
+            (employee_id, date, team_id, shift_id, None, status_code, None)
+            for date, shift_id, status_code in rows
+        ])
+    conn.commit()
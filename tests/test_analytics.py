@@ -0,0 +1,51 @@
+from conftest import add_shifts, add_team_roster
+
+
+def test_analytics_match_hand_counted_roster(db, client, auth):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    # Two employees, each: Morning (8 h) every day, Short (4 h) on the 3rd, OFF on the 7th
+    add_team_roster(conn, 1, 2, '2025-10', full_id, half_id)
+    employee_id = conn.execute("SELECT id FROM employees WHERE emp_id = 'E0000'").fetchone()['id']
+    # Malformed dates that sort inside October are skipped
+    conn.executemany('INSERT INTO roster (employee_id, date, team_id, status_code) VALUES (?, ?, 1, 3)',
+                     [(employee_id, '2025-10-1'), (employee_id, '2025-10-32'), (employee_id, '2025-10-05 ')])
+    conn.commit()
+    conn.close()
+    # A free-text day: neither worked nor a known status
+    client.put('/api/roster/E0001/2025-10-10', headers=auth, json={'team_id': 1, 'shift': 'Custom', 'status': 'Training'})
+
+    response = client.get('/api/roster/analytics?team_id=1&from=2025-09&to=2025-10', headers=auth)
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert len(body['dates']) == 30 + 31
+    assert body['dates'][0] == '2025-09-01' and body['dates'][-1] == '2025-10-31'
+
+    september = [0] * 30
+    morning = [2] * 31
+    morning[3 - 1] = 0
+    morning[7 - 1] = 0
+    morning[10 - 1] = 1
+    short = [0] * 31
+    short[3 - 1] = 2
+    assert body['coverage'] == [
+        {'shift_id': full_id, 'shift_name': 'Morning', 'shift_code': '1001', 'headcount': september + morning},
+        {'shift_id': half_id, 'shift_name': 'Short', 'shift_code': '2001', 'headcount': september + short},
+    ]
+    assert body['employees'] == [
+        {'emp_id': 'E0000', 'name': 'Employee 0000', 'hours': 29 * 8 + 4,
+         'full_days': 29, 'half_days': 1, 'off_days': 1, 'other_days': 0},
+        {'emp_id': 'E0001', 'name': 'Employee 0001', 'hours': 28 * 8 + 4,
+         'full_days': 28, 'half_days': 1, 'off_days': 1, 'other_days': 1},
+    ]
+    assert body['months'] == [
+        {'month': '2025-09', 'full_days': 0, 'half_days': 0, 'off_days': 0, 'other_days': 0},
+        {'month': '2025-10', 'full_days': 57, 'half_days': 2, 'off_days': 2, 'other_days': 1},
+    ]
+    # 2025-10-07 was a Tuesday
+    assert body['off_by_weekday'] == [0, 2, 0, 0, 0, 0, 0]
+
+
+def test_analytics_rejects_bad_ranges(db, client, auth):
+    for query in ('from=2025-13', 'from=2025-10&to=2025-09', 'from=2024-01&to=2026-01'):
+        assert client.get(f'/api/roster/analytics?team_id=1&{query}', headers=auth).status_code == 400
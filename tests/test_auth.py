@@ -0,0 +1,41 @@
+import hashlib
+import os
+import subprocess
+import sys
+
+from itsdangerous import URLSafeSerializer
+
+from conftest import ROOT
+
+
+def forged_token(api):
+    """A signed token minted with the key that ships in api.py"""
+    serializer = URLSafeSerializer(api.DEFAULT_SECRET_KEY, salt='rms-auth-token',
+                                   signer_kwargs={'digest_method': hashlib.sha256})
+    claims = {'jti': 'x', 'uid': 999, 'sub': 'intruder', 'role': 'super_admin', 'team_id': None,
+              'iat': 0, 'exp': 2 ** 40}
+    return api.SIGNED_TOKEN_PREFIX + serializer.dumps(claims)
+
+
+def test_signed_tokens_rejected_in_session_mode(db, client):
+    assert db.AUTH_TOKEN_MODE == 'session'
+    headers = {'Authorization': forged_token(db)}
+    assert client.get('/api/users', headers=headers).status_code == 401
+    response = client.post('/api/users', headers=headers,
+                           json={'username': 'evil', 'password': 'x', 'role': 'super_admin'})
+    assert response.status_code == 401
+    assert client.post('/api/logout', headers=headers).status_code in (200, 401)
+
+
+def test_signed_mode_requires_private_secret_key(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k != 'SECRET_KEY'}
+    env.update(AUTH_TOKEN_MODE='signed', PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-c', 'import api'], cwd=tmp_path, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert 'SECRET_KEY' in result.stderr
+
+    env['SECRET_KEY'] = 'a-private-test-key'
+    result = subprocess.run([sys.executable, '-c', 'import api'], cwd=tmp_path, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,36 @@
+import pytest
+
+from conftest import add_shifts, add_team_roster
+
+
+def rebuild_object_format(payload):
+    """The default GET /api/roster payload, reconstructed from format=columnar"""
+    roster = [
+        {'emp_id': emp_id, 'name': name, 'shifts': [
+            {'date': date, 'shift': payload['shifts'][shift], 'status': payload['statuses'][status]}
+            for date, shift, status in zip(payload['dates'], shift_row, status_row)
+        ]}
+        for emp_id, name, shift_row, status_row in zip(payload['emp_ids'], payload['names'],
+                                                       payload['shift_index'], payload['status_index'])
+    ]
+    return {'dates': payload['dates'], 'roster': roster, 'available_months': payload['available_months'],
+            'version': payload['version'], 'shifts_version': payload['shifts_version']}
+
+
+@pytest.mark.parametrize('query', ['month=2025-10', 'all=true', 'month=2030-01'])
+def test_columnar_round_trips_to_object_format(db, client, auth, query):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 3, '2025-10', full_id, half_id)
+    add_team_roster(conn, 1, 1, '2025-11', full_id, half_id, start=3)
+    conn.execute("INSERT INTO employees (emp_id, name, team_id) VALUES ('E9999', 'No Roster', 1)")
+    conn.commit()
+    conn.close()
+    # Free text that matches no shift or status is kept verbatim
+    assert client.put('/api/roster/E0000/2025-10-02', headers=auth,
+                      json={'team_id': 1, 'shift': 'Training', 'status': 'Workshop'}).status_code == 200
+
+    expected = client.get(f'/api/roster?team_id=1&{query}', headers=auth).get_json()
+    columnar = client.get(f'/api/roster?team_id=1&{query}&format=columnar', headers=auth).get_json()
+    assert columnar['format'] == 'columnar'
+    assert rebuild_object_format(columnar) == expected
@@ -0,0 +1,27 @@
+from conftest import add_shifts, add_team_roster
+
+
+def test_export_etag_differs_per_negotiated_format(db, client, auth):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 2, '2025-10', full_id, half_id)
+    conn.close()
+    url = '/api/roster/export?team_id=1&month=2025-10'
+
+    # Streamed bodies are read right away so each request context closes in order
+    csv_response = client.get(url, headers=auth)
+    csv_response.get_data()
+    ndjson_response = client.get(url, headers={**auth, 'Accept': 'application/x-ndjson'})
+    ndjson_response.get_data()
+    assert csv_response.mimetype == 'text/csv'
+    assert ndjson_response.mimetype == 'application/x-ndjson'
+    assert csv_response.headers['ETag'] != ndjson_response.headers['ETag']
+    assert 'Accept' in ndjson_response.headers['Vary']
+
+    # Revalidating one representation must not match the other
+    revalidate = {**auth, 'Accept': 'application/x-ndjson', 'If-None-Match': csv_response.headers['ETag']}
+    response = client.get(url, headers=revalidate)
+    response.get_data()
+    assert response.status_code == 200
+    revalidate['If-None-Match'] = ndjson_response.headers['ETag']
+    assert client.get(url, headers=revalidate).status_code == 304
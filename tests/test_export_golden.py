@@ -0,0 +1,57 @@
+"""The streamed CSV export must match the baseline export byte for byte.
+
+The fixtures in tests/fixtures were written by the baseline (pre-streaming)
+api.py from the roster that ``build_roster`` creates. Only endpoints both
+versions share are used, so the same steps can be replayed against either.
+"""
+import os
+
+import pytest
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def build_roster(client, auth):
+    def call(method, url, body, expected):
+        response = getattr(client, method)(url, headers=auth, json=body)
+        assert response.status_code == expected, (url, response.get_json())
+        return response.get_json()
+
+    shift = {'duration': 8, 'type': 'full', 'shift_timing': '09:00-17:00'}
+    morning = call('post', '/api/shifts', {**shift, 'shift_name': 'Morning', 'shift_code': '1001'}, 201)['id']
+    night = call('post', '/api/shifts', {**shift, 'shift_name': 'Night', 'shift_code': 'N,1'}, 201)['id']
+    half = call('post', '/api/shifts', {**shift, 'type': 'half', 'shift_name': 'Short', 'shift_code': '2001'}, 201)['id']
+
+    # Listed by name, not by emp_id
+    for emp_id, name in (('E3', 'Alice'), ('E1', 'Carol'), ('E2', 'Bob'), ('E4', 'Dave')):
+        call('post', '/api/employees', {'emp_id': emp_id, 'name': name, 'team_id': 1}, 201)
+
+    def month(emp_id, month, shift_id, off=(), half_dates=()):
+        call('post', '/api/roster', {
+            'emp_id': emp_id, 'month': month, 'shift_id': shift_id, 'team_id': 1, 'off_dates': list(off),
+            'half_dates': [{'date': date, 'shift_id': half} for date in half_dates]
+        }, 201)
+
+    # September gives the October OFF rows a full-day shift to repeat
+    month('E1', '2025-09', night)
+    month('E1', '2025-10', morning, off=['2025-10-01', '2025-10-02', '2025-10-18'], half_dates=['2025-10-10'])
+    month('E2', '2025-10', night, off=['2025-10-05'], half_dates=['2025-10-06', '2025-10-07'])
+    month('E3', '2025-09', morning, off=['2025-09-30'])
+    # E4 has no roster at all; E3 none in October
+    call('put', '/api/roster/E2/2025-10-08', {'team_id': 1, 'shift': 'Morning (1001)', 'status': 'Training'}, 200)
+    call('put', '/api/roster/E2/2025-10-09', {'team_id': 1, 'shift': 'Custom', 'status': 'Full Day'}, 200)
+    call('put', '/api/roster/E1/2025-10-20', {'team_id': 1, 'shift': 'Night (N,1)', 'status': 'Full Day'}, 200)
+    call('put', '/api/roster/E1/2025-10-21', {'team_id': 1, 'shift': 'N/A', 'status': 'OFF'}, 200)
+
+
+@pytest.mark.parametrize('query, fixture', [
+    ('month=2025-10', 'roster_export_2025-10.csv'),
+    ('all=true', 'roster_export_all.csv'),
+    ('', 'roster_export_latest.csv'),
+])
+def test_streamed_export_matches_baseline(db, client, auth, query, fixture):
+    build_roster(client, auth)
+    response = client.get(f'/api/roster/export?team_id=1&{query}', headers=auth)
+    assert response.status_code == 200
+    with open(os.path.join(FIXTURES, fixture), 'rb') as f:
+        assert response.get_data() == f.read()
@@ -0,0 +1,70 @@
+import time
+
+from conftest import add_shifts, add_team_roster
+
+SUPERVISOR = {'username': 'faizan.ahmad', 'password': '123456'}
+
+
+def wait_for(client, auth, job):
+    for _ in range(200):
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+        job = client.get(f"/api/roster/export/jobs/{job['id']}", headers=auth).get_json()
+    raise AssertionError(f'export job did not finish: {job}')
+
+
+def seed(api):
+    conn = api.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 2, '2025-10', full_id, half_id)
+    other_team = conn.execute("INSERT INTO teams (name, description) VALUES ('Other', '')").lastrowid
+    conn.commit()
+    add_team_roster(conn, other_team, 1, '2025-10', full_id, half_id, start=10)
+    conn.close()
+    return other_team
+
+
+def test_export_job_writes_artifact_and_reuses_it(db, client, auth):
+    seed(db)
+    response = client.post('/api/roster/export/jobs', headers=auth, json={'team_id': 1, 'month': '2025-10'})
+    assert response.status_code == 202
+    job = wait_for(client, auth, response.get_json())
+    assert (job['status'], job['rows'], job['filter']) == ('done', 2 * 31, '2025-10')
+
+    download = client.get(job['download_url'], headers=auth)
+    assert download.status_code == 200
+    assert download.get_data() == client.get('/api/roster/export?team_id=1&month=2025-10', headers=auth).get_data()
+    download.close()
+
+    # An identical request for the unchanged roster is served from the file
+    again = client.post('/api/roster/export/jobs', headers=auth, json={'team_id': 1, 'month': '2025-10'})
+    assert again.status_code == 200
+    assert again.get_json()['id'] == job['id']
+
+    # An edit makes the next request build a new file
+    client.put('/api/roster/E0000/2025-10-01', headers=auth, json={'team_id': 1, 'shift': 'N/A', 'status': 'OFF'})
+    changed = client.post('/api/roster/export/jobs', headers=auth, json={'team_id': 1, 'month': '2025-10'})
+    assert changed.status_code == 202
+    assert changed.get_json()['id'] != job['id']
+    wait_for(client, auth, changed.get_json())
+    # The outdated file was replaced
+    assert client.get(job['download_url'], headers=auth).status_code == 410
+
+
+def test_export_jobs_are_limited_to_the_users_team(db, client, auth):
+    other_team = seed(db)
+    supervisor = {'Authorization': client.post('/api/login', json=SUPERVISOR).get_json()['token']}
+
+    other_job = client.post('/api/roster/export/jobs', headers=auth, json={'team_id': other_team, 'all': True}).get_json()
+    wait_for(client, auth, other_job)
+    assert client.get(f"/api/roster/export/jobs/{other_job['id']}", headers=supervisor).status_code == 404
+    assert client.get(f"/api/roster/export/jobs/{other_job['id']}/download", headers=supervisor).status_code == 404
+    assert client.get('/api/roster/export/jobs/missing', headers=auth).status_code == 404
+
+    # A supervisor's team_id is ignored in favour of their own team
+    own_job = client.post('/api/roster/export/jobs', headers=supervisor, json={'team_id': other_team, 'all': True}).get_json()
+    assert own_job['team_id'] == 1
+    own_job = wait_for(client, supervisor, own_job)
+    assert client.get(f"/api/roster/export/jobs/{own_job['id']}", headers=supervisor).status_code == 200
+    assert client.get(f"/api/roster/export/jobs/{own_job['id']}", headers=auth).status_code == 200
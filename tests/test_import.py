@@ -0,0 +1,92 @@
+import io
+
+from conftest import add_shifts, add_team_roster
+
+
+def post_csv(client, auth, text, team_id=1):
+    body = text.encode() if isinstance(text, str) else text
+    return client.post(f'/api/import?team_id={team_id}', headers={**auth, 'Content-Type': 'text/csv'}, data=body)
+
+
+def team_cells(api, team_id):
+    conn = api.connect_db()
+    try:
+        return [tuple(row) for row in conn.execute('''
+            SELECT emp_id, date, shift, status FROM roster_cells WHERE team_id = ? ORDER BY emp_id, date
+        ''', (team_id,))]
+    finally:
+        conn.close()
+
+
+def test_import_roster_layout_creates_employees(db, client, auth):
+    # Spreadsheet exports often start with a byte order mark
+    conn = db.connect_db()
+    add_shifts(conn)
+    conn.close()
+    response = post_csv(client, auth, '\ufeffEmployee Name,Employee ID,Date,Shift,Status\r\n'
+                                      'Ann,A1,2025-10-01,Morning (1001),Full Day\r\n'
+                                      'Ann,A1,2025-10-02,N/A,OFF\r\n'
+                                      'Bob,B1,2025-10-01,Short (2001),Half Day\r\n')
+    assert response.status_code == 200, response.get_json()
+    report = response.get_json()
+    assert (report['format'], report['rows'], report['cells'], report['employees_created']) == ('roster', 3, 3, 2)
+    assert team_cells(db, 1) == [('A1', '2025-10-01', 'Morning (1001)', 'Full Day'),
+                                 ('A1', '2025-10-02', 'N/A', 'OFF'),
+                                 ('B1', '2025-10-01', 'Short (2001)', 'Half Day')]
+
+
+def test_import_export_layout_round_trips(db, client, auth):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 3, '2025-10', full_id, half_id)
+    conn.close()
+    url = '/api/roster/export?team_id=1&month=2025-10'
+    exported = client.get(url, headers=auth).get_data()
+    before = team_cells(db, 1)
+
+    conn = db.connect_db()
+    conn.execute('DELETE FROM roster')
+    conn.commit()
+    conn.close()
+    response = post_csv(client, auth, exported)
+    assert response.status_code == 200, response.get_json()
+    report = response.get_json()
+    assert (report['format'], report['cells'], report['error_count']) == ('export', 3 * 31, 0)
+    assert team_cells(db, 1) == before
+    assert client.get(url, headers=auth).get_data() == exported
+
+
+def test_import_reports_bad_rows_with_line_numbers(db, client, auth):
+    conn = db.connect_db()
+    add_shifts(conn)
+    conn.execute("INSERT INTO employees (emp_id, name, team_id) VALUES ('E1', 'One', 1)")
+    conn.commit()
+    conn.close()
+    response = post_csv(client, auth, 'Emp ID,Date,Shift Code,Is/OFF\n'
+                                      'E1,2025-10-01,1001,0\n'
+                                      '\n'
+                                      'E1,2025-13-01,1001,0\n'
+                                      'E1,2025-10-02,9999,0\n'
+                                      'E2,2025-10-03,1001,0\n'
+                                      'E1,2025-10-04,1001\n')
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report['cells'] == 1 and report['error_count'] == 4
+    assert report['errors'] == [
+        {'line': 4, 'emp_id': 'E1', 'error': 'Date must be in YYYY-MM-DD format'},
+        {'line': 5, 'emp_id': 'E1', 'error': 'Unknown shift code 9999'},
+        {'line': 6, 'emp_id': 'E2', 'error': 'Employee not found in team'},
+        {'line': 7, 'emp_id': 'E1', 'error': 'Expected 4 columns, got 3'},
+    ]
+
+
+def test_import_rejects_non_utf8(db, client, auth):
+    body = 'Employee ID,Employee Name\nE1,Zoë\n'.encode('latin-1')
+    response = post_csv(client, auth, body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'CSV must be UTF-8 encoded'}
+
+    # Multipart uploads go through the same reader
+    response = client.post('/api/import?team_id=1', headers=auth,
+                           data={'file': (io.BytesIO(body), 'roster.csv')})
+    assert response.get_json() == {'error': 'CSV must be UTF-8 encoded'}
@@ -0,0 +1,46 @@
+import sqlite3
+
+import api
+
+
+def migrate_to(path, version):
+    migrations = api.MIGRATIONS
+    try:
+        api.MIGRATIONS = [step for step in migrations if step[0] <= version]
+        api.run_migrations(path)
+    finally:
+        api.MIGRATIONS = migrations
+
+
+def test_unique_cells_migration_keeps_one_row_per_employee_day(tmp_path, monkeypatch):
+    path = str(tmp_path / 'old.db')
+    migrate_to(path, 6)
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO employees (emp_id, name, team_id) VALUES ('E1', 'One', 1)")
+    one = cursor.lastrowid
+    cursor.execute("INSERT INTO employees (emp_id, name, team_id) VALUES ('E2', 'Two', 1)")
+    two = cursor.lastrowid
+    cells = [
+        (one, '2025-10-01', 1, 'first'),
+        (one, '2025-10-01', 1, 'second'),
+        (one, '2025-10-01', None, 'teamless'),
+        (one, '2025-10-02', None, 'older teamless'),
+        (one, '2025-10-02', 1, 'newer team'),
+        (two, '2025-10-01', None, 'only'),
+    ]
+    cursor.executemany('INSERT INTO roster (employee_id, date, team_id, status_label) VALUES (?, ?, ?, ?)', cells)
+    conn.commit()
+    conn.close()
+
+    # One duplicate per transaction
+    monkeypatch.setattr(api, 'ROSTER_DEDUP_CHUNK', 1)
+    api.run_migrations(path)
+
+    conn = sqlite3.connect(path)
+    survivors = conn.execute('SELECT employee_id, date, status_label FROM roster ORDER BY employee_id, date').fetchall()
+    assert survivors == [(one, '2025-10-01', 'first'), (one, '2025-10-02', 'newer team'), (two, '2025-10-01', 'only')]
+    indexes = {row[1]: row[2] for row in conn.execute('PRAGMA index_list(roster)')}
+    assert indexes['idx_roster_employee_date'] == 1
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == api.MIGRATIONS[-1][0]
+    conn.close()
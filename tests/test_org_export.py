@@ -0,0 +1,44 @@
+import hashlib
+import io
+import json
+import zipfile
+
+from conftest import add_shifts, add_team_roster
+
+
+def test_org_export_zips_every_team_with_manifest(db, client, auth):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO teams (name, description) VALUES ('Ops & Support', '')")
+    ops_id = cursor.lastrowid
+    cursor.execute("INSERT INTO teams (name, description) VALUES ('Empty', '')")
+    empty_id = cursor.lastrowid
+    conn.commit()
+    helpdesk_id = conn.execute("SELECT id FROM teams WHERE name = 'Helpdesk'").fetchone()['id']
+    add_team_roster(conn, helpdesk_id, 3, '2025-10', full_id, half_id)
+    add_team_roster(conn, ops_id, 2, '2025-10', full_id, half_id, start=100)
+    conn.close()
+
+    response = client.get('/api/roster/export/org?month=2025-10', headers=auth)
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    manifest = json.loads(archive.read('manifest.json'))
+    teams = db.cached_reference('teams', db.TEAMS_SCOPE, db.load_teams)
+
+    assert archive.namelist() == [entry['file'] for entry in manifest['teams']] + ['manifest.json']
+    assert [entry['team_id'] for entry in manifest['teams']] == [team['id'] for team in teams]
+    assert f'{ops_id}-Ops_Support.csv' in archive.namelist()
+    for entry in manifest['teams']:
+        data = archive.read(entry['file'])
+        team_export = client.get(f"/api/roster/export?team_id={entry['team_id']}&month=2025-10", headers=auth)
+        if entry['team_id'] == empty_id:
+            assert data.count(b'\n') == 1
+        else:
+            assert data == team_export.get_data()
+        assert entry['bytes'] == len(data)
+        assert entry['sha256'] == hashlib.sha256(data).hexdigest()
+        assert entry['rows'] == data.count(b'\n') - 1
+    rows = {entry['team_id']: entry['rows'] for entry in manifest['teams']}
+    assert rows[helpdesk_id] == 3 * 31 and rows[ops_id] == 2 * 31 and rows[empty_id] == 0
+
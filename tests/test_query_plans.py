@@ -0,0 +1,30 @@
+"""Hot queries must seek an index; a plan that falls back to SCAN is a regression."""
+import pytest
+
+HOT_QUERIES = {
+    'roster range scan': ('''
+        SELECT employee_id, date, shift_id, shift_label, status_code, status_label
+        FROM roster
+        WHERE team_id = ? AND date >= ? AND date <= ?
+    ''', (1, '2025-10-01', '2025-10-31')),
+    'roster month dates': ('''
+        SELECT DISTINCT date FROM roster
+        WHERE team_id = ? AND date >= ? AND date < ?
+        ORDER BY date
+    ''', (1, '2025-10-01', '2025-11-01')),
+    'latest roster date': ('SELECT MAX(date) AS date FROM roster WHERE team_id = ?', (1,)),
+    'team employee list': ('SELECT id, emp_id, name FROM employees WHERE team_id = ? ORDER BY name', (1,)),
+    'session delete by username': ('DELETE FROM sessions WHERE username = ?', ('super_admin',)),
+}
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_index(db, name):
+    sql, params = HOT_QUERIES[name]
+    conn = db.connect_db()
+    try:
+        plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+    finally:
+        conn.close()
+    assert not any(step.startswith('SCAN') for step in plan), plan
+    assert any(step.startswith('SEARCH') and 'USING' in step and 'INDEX' in step for step in plan), plan
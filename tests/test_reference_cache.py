@@ -0,0 +1,27 @@
+from conftest import add_shifts
+
+
+def test_reference_cache_ignores_callers_old_snapshot(db):
+    conn = db.connect_db()
+    full_id, _ = add_shifts(conn)
+    conn.close()
+    assert full_id in db.get_shift_catalog().displays
+
+    # A caller inside a read transaction (as export jobs are) still sees
+    # the catalog as of its snapshot...
+    reader = db.connect_db()
+    reader.execute('BEGIN')
+    reader.execute('SELECT COUNT(*) FROM shifts').fetchone()
+
+    # ...while another connection adds a shift
+    writer = db.connect_db()
+    new_id = writer.execute("INSERT INTO shifts (shift_name, shift_code, duration, type) "
+                            "VALUES ('Night', '3001', 8, 'full')").lastrowid
+    writer.commit()
+    writer.close()
+
+    assert new_id in db.get_shift_catalog().displays
+    reader.rollback()
+    reader.close()
+    # The entry cached for the new version holds the new shift
+    assert new_id in db.get_shift_catalog().displays
@@ -0,0 +1,97 @@
+from conftest import add_shifts, add_team_roster, reset_worker_state
+
+NO_CHANGES = {'inserted': 0, 'updated': 0, 'deleted': 0}
+
+
+def team_version(api, team_id):
+    conn = api.connect_db()
+    try:
+        return api.fetch_roster_versions(conn.cursor(), team_id)
+    finally:
+        conn.close()
+
+
+def test_unchanged_month_resubmission_writes_nothing(db):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    employee_id = conn.execute("INSERT INTO employees (emp_id, name, team_id) VALUES ('E1', 'One', 1)").lastrowid
+    rows = db.build_month_rows(db.month_dates('2025-10'), full_id, ['2025-10-07'], {'2025-10-03': half_id})
+
+    first = db.save_employee_month(conn.cursor(), employee_id, 1, '2025-10', rows)
+    conn.commit()
+    assert first == {'inserted': 31, 'updated': 0, 'deleted': 0}
+
+    writes, version = conn.total_changes, team_version(db, 1)
+    second = db.save_employee_month(conn.cursor(), employee_id, 1, '2025-10', rows)
+    conn.commit()
+    assert second == NO_CHANGES
+    assert conn.total_changes == writes
+    assert team_version(db, 1) == version
+    conn.close()
+
+
+def test_unchanged_month_repost_writes_nothing(db, client, auth):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    conn.execute("INSERT INTO employees (emp_id, name, team_id) VALUES ('E1', 'One', 1)")
+    conn.commit()
+    conn.close()
+    body = {'emp_id': 'E1', 'month': '2025-10', 'shift_id': full_id, 'team_id': 1,
+            'off_dates': ['2025-10-07'], 'half_dates': [{'date': '2025-10-03', 'shift_id': half_id}]}
+
+    assert client.post('/api/roster', headers=auth, json=body).get_json()['changes']['inserted'] == 31
+    version = team_version(db, 1)
+    response = client.post('/api/roster', headers=auth, json=body)
+    assert response.status_code == 201
+    assert response.get_json()['changes'] == NO_CHANGES
+    assert team_version(db, 1) == version
+
+
+def count_roster_statements(api, client, auth, monkeypatch, query):
+    """Statements run by one warm GET /api/roster"""
+    statements = []
+    connect_db = api.connect_db
+
+    def traced_connect_db(*args, **kwargs):
+        conn = connect_db(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(api, 'connect_db', traced_connect_db)
+    reset_worker_state()
+    assert client.get(query, headers=auth).status_code == 200  # fill per-worker caches
+    statements.clear()
+    assert client.get(query, headers=auth).status_code == 200
+    monkeypatch.setattr(api, 'connect_db', connect_db)
+    return statements
+
+
+ROSTER_QUERIES = ('/api/roster?team_id=1&month=2025-10', '/api/roster?team_id=1&month=2025-10&format=columnar')
+
+
+def test_roster_statement_count_does_not_grow_with_headcount(db, client, auth, monkeypatch):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 5, '2025-10', full_id, half_id)
+    small = {query: count_roster_statements(db, client, auth, monkeypatch, query) for query in ROSTER_QUERIES}
+    add_team_roster(conn, 1, 195, '2025-10', full_id, half_id, start=5)
+    conn.close()
+
+    for query in ROSTER_QUERIES:
+        large = count_roster_statements(db, client, auth, monkeypatch, query)
+        assert small[query] and len(large) == len(small[query]), (small[query], large)
+    assert len(client.get(ROSTER_QUERIES[0], headers=auth).get_json()['roster']) == 200
+
+
+def test_put_accepts_non_string_shift_as_free_text(db, client, auth):
+    conn = db.connect_db()
+    add_shifts(conn)
+    conn.execute("INSERT INTO employees (emp_id, name, team_id) VALUES ('E1', 'One', 1)")
+    conn.commit()
+    conn.close()
+
+    response = client.put('/api/roster/E1/2025-10-01', headers=auth,
+                          json={'team_id': 1, 'shift': 5, 'status': 'Full Day'})
+    assert response.status_code == 200, response.get_json()
+    entry = client.get('/api/roster/E1/2025-10-01?team_id=1', headers=auth).get_json()
+    assert entry['shift'] == '5' and entry['status'] == 'Full Day'
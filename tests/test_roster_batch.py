@@ -0,0 +1,51 @@
+from conftest import add_shifts, add_team_roster
+
+
+def roster_cell(api, emp_id, date):
+    conn = api.connect_db()
+    try:
+        row = conn.execute('SELECT shift, status FROM roster_cells WHERE emp_id = ? AND date = ?',
+                           (emp_id, date)).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def seed(api):
+    conn = api.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 2, '2025-10', full_id, half_id)
+    conn.close()
+
+
+def test_batch_with_invalid_cells_rolls_back_and_reports_each(db, client, auth):
+    seed(db)
+    response = client.patch('/api/roster', headers=auth, json={'team_id': 1, 'changes': [
+        {'emp_id': 'E0000', 'date': '2025-10-01', 'shift': 'N/A', 'status': 'OFF'},
+        {'emp_id': 'E0001', 'date': '2025-10-02', 'shift': 5, 'status': 'OFF'},
+        {'emp_id': 'E0001', 'date': '2025-10-32', 'shift': 'N/A', 'status': 'OFF'},
+        {'emp_id': 'E9999', 'date': '2025-10-02', 'shift': 'N/A', 'status': 'OFF'},
+        {'emp_id': 'E0001', 'date': '2025-10-04'},
+        ['E0001', '2025-10-05', 'N/A', 'OFF'],
+    ]})
+    assert response.status_code == 400
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == [
+        'updated', 'invalid', 'invalid', 'not_found', 'invalid', 'invalid']
+    assert results[1]['error'] == 'emp_id, shift and status must be strings'
+    assert results[5] == {'emp_id': None, 'date': None, 'status': 'invalid',
+                          'error': 'emp_id, date, shift and status are required'}
+    # The valid first cell was rolled back with the rest
+    assert roster_cell(db, 'E0000', '2025-10-01') == {'shift': 'Morning (1001)', 'status': 'Full Day'}
+
+
+def test_valid_batch_commits(db, client, auth):
+    seed(db)
+    response = client.patch('/api/roster', headers=auth, json={'team_id': 1, 'changes': [
+        {'emp_id': 'E0000', 'date': '2025-10-01', 'shift': 'N/A', 'status': 'OFF'},
+        {'emp_id': 'E0001', 'date': '2025-11-01', 'shift': 'Short (2001)', 'status': 'Half Day'},
+    ]})
+    assert response.status_code == 200, response.get_json()
+    assert [result['status'] for result in response.get_json()['results']] == ['updated', 'updated']
+    assert roster_cell(db, 'E0000', '2025-10-01') == {'shift': 'N/A', 'status': 'OFF'}
+    assert roster_cell(db, 'E0001', '2025-11-01') == {'shift': 'Short (2001)', 'status': 'Half Day'}
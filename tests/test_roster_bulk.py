@@ -0,0 +1,110 @@
+from conftest import add_shifts, reset_worker_state
+
+
+def add_employees(api, count, start=0):
+    conn = api.connect_db()
+    conn.executemany('INSERT INTO employees (emp_id, name, team_id) VALUES (?, ?, 1)',
+                     [(f'E{n:04d}', f'Employee {n:04d}') for n in range(start, start + count)])
+    conn.commit()
+    conn.close()
+
+
+def shift_ids(api):
+    conn = api.connect_db()
+    ids = add_shifts(conn)
+    conn.close()
+    return ids
+
+
+def month_cells(api, emp_id):
+    conn = api.connect_db()
+    try:
+        return {row['date']: (row['shift'], row['status']) for row in conn.execute(
+            "SELECT date, shift, status FROM roster_cells WHERE emp_id = ? AND date LIKE '2025-10-%'", (emp_id,))}
+    finally:
+        conn.close()
+
+
+def test_bulk_reports_employee_errors_and_saves_the_rest(db, client, auth):
+    full_id, half_id = shift_ids(db)
+    add_employees(db, 2)
+    response = client.post('/api/roster/bulk', headers=auth, json={
+        'month': '2025-10', 'team_id': 1, 'shift_id': full_id, 'employees': [
+            {'emp_id': 'E0000', 'off_dates': ['2025-10-07'], 'half_dates': [{'date': '2025-10-03', 'shift_id': half_id}]},
+            {'emp_id': 'E0001', 'off_dates': ['2025-11-01']},
+            {'emp_id': 'E0000'},
+            {'emp_id': 'E9999'},
+            {'emp_id': ['E0001']},
+            {'emp_id': 'E0001', 'shift_id': 999},
+            {'emp_id': 'E0001', 'half_dates': [{'date': '2025-10-03', 'shift_id': 999}]},
+            {'emp_id': 'E0001', 'off_dates': 5},
+            'E0001',
+        ]})
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['saved'] == ['E0000']
+    assert body['changes'] == {'inserted': 31, 'updated': 0, 'deleted': 0}
+    assert [error['error'] for error in body['errors']] == [
+        'OFF date 2025-11-01 is not in 2025-10',
+        'Employee listed more than once',
+        'Employee not found in team',
+        'emp_id must be a string',
+        'Employee listed more than once',
+        'Employee listed more than once',
+        'Employee listed more than once',
+        'emp_id is required',
+    ]
+
+    cells = month_cells(db, 'E0000')
+    assert len(cells) == 31
+    assert cells['2025-10-07'] == ('N/A', 'OFF')
+    assert cells['2025-10-03'] == ('Short (2001)', 'Half Day')
+    assert cells['2025-10-01'] == ('Morning (1001)', 'Full Day')
+    assert month_cells(db, 'E0001') == {}
+
+
+def test_bulk_rejects_request_with_no_valid_employee(db, client, auth):
+    full_id, _ = shift_ids(db)
+    add_employees(db, 1)
+    for entry in ({'emp_id': 'E0000', 'shift_id': 999}, {'emp_id': 'E0000', 'off_dates': 5},
+                  {'emp_id': 'E0000', 'half_dates': [{'date': ['2025-10-03']}]}):
+        response = client.post('/api/roster/bulk', headers=auth,
+                               json={'month': '2025-10', 'team_id': 1, 'employees': [entry]})
+        assert response.status_code == 400
+        assert response.get_json()['saved'] == []
+
+
+def bulk_statements(api, client, auth, monkeypatch, body):
+    """Statements run by one POST /api/roster/bulk, without the rows of each executemany"""
+    statements = []
+    connect_db = api.connect_db
+
+    def traced_connect_db(*args, **kwargs):
+        conn = connect_db(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(api, 'connect_db', traced_connect_db)
+    reset_worker_state()
+    response = client.post('/api/roster/bulk', headers=auth, json=body)
+    monkeypatch.setattr(api, 'connect_db', connect_db)
+    assert response.status_code == 201, response.get_json()
+    # executemany traces one statement per row; count each write statement once
+    writes = ('INSERT INTO roster', 'UPDATE roster', 'DELETE FROM roster')
+    return [statement for statement in statements if not statement.lstrip().startswith(writes)], response.get_json()
+
+
+def test_bulk_statement_count_does_not_grow_with_headcount(db, client, auth, monkeypatch):
+    full_id, half_id = shift_ids(db)
+    add_employees(db, 200)
+    counts = []
+    # Both above STATS_DEFER_MIN_ROWS cells, so both take the same path
+    for employees in (20, 200):
+        body = {'month': '2025-10', 'team_id': 1, 'shift_id': full_id, 'employees': [
+            {'emp_id': f'E{n:04d}', 'off_dates': ['2025-10-07'], 'half_dates': [{'date': '2025-10-03', 'shift_id': half_id}]}
+            for n in range(employees)
+        ]}
+        statements, result = bulk_statements(db, client, auth, monkeypatch, body)
+        assert result['changes']['inserted'] == (employees - len(counts) * 20) * 31
+        counts.append(statements)
+    assert len(counts[0]) == len(counts[1]), counts
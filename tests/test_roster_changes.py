@@ -0,0 +1,72 @@
+from conftest import add_shifts, add_team_roster
+
+
+def changes(client, auth, since, **params):
+    query = '&'.join(f'{key}={value}' for key, value in {'team_id': 1, 'since': since, **params}.items())
+    response = client.get(f'/api/roster/changes?{query}', headers=auth)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def seed(api, client, auth):
+    conn = api.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 2, '2025-10', full_id, half_id)
+    conn.close()
+    return changes(client, auth, 0)['version']
+
+
+def test_delta_reports_changed_and_deleted_cells(db, client, auth):
+    version = seed(db, client, auth)
+    client.patch('/api/roster', headers=auth, json={'team_id': 1, 'changes': [
+        {'emp_id': 'E0000', 'date': '2025-10-01', 'shift': 'N/A', 'status': 'OFF'},
+        {'emp_id': 'E0001', 'date': '2025-11-01', 'shift': 'Short (2001)', 'status': 'Half Day'},
+    ]})
+    # Changed twice, reported once with its final value
+    client.put('/api/roster/E0000/2025-10-01', headers=auth, json={'team_id': 1, 'shift': 'Custom', 'status': 'Training'})
+    client.delete('/api/roster/employee?emp_id=E0001&month=2025-10&team_id=1', headers=auth)
+
+    delta = changes(client, auth, version)
+    assert delta['reload'] is False
+    cells = {(cell['emp_id'], cell['date']): cell for cell in delta['changes']}
+    assert len(cells) == len(delta['changes']) == 2 + 31
+    assert cells['E0000', '2025-10-01'] == {'emp_id': 'E0000', 'date': '2025-10-01', 'shift': 'Custom',
+                                           'status': 'Training', 'deleted': False}
+    assert cells['E0001', '2025-11-01']['status'] == 'Half Day'
+    assert cells['E0001', '2025-10-15'] == {'emp_id': 'E0001', 'date': '2025-10-15', 'shift': '',
+                                           'status': '', 'deleted': True}
+
+    october = changes(client, auth, version, month='2025-10')['changes']
+    assert len(october) == 1 + 31 and all(cell['date'].startswith('2025-10') for cell in october)
+
+
+def test_up_to_date_client_gets_empty_delta(db, client, auth):
+    version = seed(db, client, auth)
+    delta = changes(client, auth, version)
+    assert (delta['version'], delta['reload'], delta['changes']) == (version, False, [])
+
+
+def test_stale_or_pruned_versions_fall_back_to_reload(db, client, auth):
+    version = seed(db, client, auth)
+    client.put('/api/roster/E0000/2025-10-01', headers=auth, json={'team_id': 1, 'shift': 'N/A', 'status': 'OFF'})
+    assert changes(client, auth, version)['reload'] is False
+
+    # A version from the future (e.g. a restored database) cannot be diffed
+    assert changes(client, auth, version + 100)['reload'] is True
+
+    # Log entries pruned past ``since``
+    conn = db.connect_db()
+    conn.execute('DELETE FROM roster_changes WHERE version = ?', (version,))
+    conn.commit()
+    conn.close()
+    assert changes(client, auth, version - 1)['reload'] is True
+    assert changes(client, auth, version)['reload'] is False
+
+    # Employee changes are not expressed as cells
+    client.post('/api/employees', headers=auth, json={'emp_id': 'E9', 'name': 'Nine', 'team_id': 1})
+    assert changes(client, auth, version)['reload'] is True
+
+    # A changed shift catalog means every displayed cell may be stale
+    delta = changes(client, auth, changes(client, auth, 0)['version'])
+    assert delta['reload'] is False
+    assert changes(client, auth, delta['version'], shifts_version=delta['shifts_version'] - 1)['reload'] is True
@@ -0,0 +1,85 @@
+import os
+from datetime import datetime, timedelta
+
+from conftest import SUPER_ADMIN
+
+
+def login(client):
+    return client.post('/api/login', json=SUPER_ADMIN).get_json()['token']
+
+
+def set_session(api, token, **fields):
+    conn = api.connect_db()
+    conn.execute(f"UPDATE sessions SET {', '.join(f'{field} = ?' for field in fields)} WHERE token = ?",
+                 (*fields.values(), token))
+    conn.commit()
+    conn.close()
+    # Drop the worker's cached lookup so the next request reads the row
+    api.invalidate_auth_cache(token=token)
+
+
+def last_accessed(api, token):
+    conn = api.connect_db()
+    try:
+        return conn.execute('SELECT last_accessed FROM sessions WHERE token = ?', (token,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def ago(seconds):
+    return (datetime.now() - timedelta(seconds=seconds)).isoformat()
+
+
+def test_idle_and_expired_sessions_are_rejected(db, client):
+    idle, expired, live = login(client), login(client), login(client)
+    set_session(db, idle, last_accessed=ago(db.SESSION_IDLE_TTL + 60))
+    set_session(db, expired, created_at=ago(db.SESSION_ABSOLUTE_TTL + 60))
+    set_session(db, live, created_at=ago(db.SESSION_ABSOLUTE_TTL - 60), last_accessed=ago(db.SESSION_IDLE_TTL - 60))
+
+    assert client.get('/api/validate', headers={'Authorization': idle}).status_code == 401
+    assert client.get('/api/validate', headers={'Authorization': expired}).status_code == 401
+    assert client.get('/api/validate', headers={'Authorization': live}).status_code == 200
+
+
+def test_stale_last_accessed_is_touched(db, client, monkeypatch):
+    token = login(client)
+    stale = ago(db.SESSION_TOUCH_INTERVAL + 60)
+
+    # Without the maintenance thread the update is written inline
+    set_session(db, token, last_accessed=stale)
+    assert client.get('/api/validate', headers={'Authorization': token}).status_code == 200
+    assert last_accessed(db, token) > stale
+
+    # With it, the update waits for the next flush
+    monkeypatch.setattr(db, 'SESSION_MAINTENANCE_INTERVAL', 60)
+    monkeypatch.setattr(db, '_maintenance_pid', os.getpid())  # no thread in tests
+    set_session(db, token, last_accessed=stale)
+    assert client.get('/api/validate', headers={'Authorization': token}).status_code == 200
+    assert last_accessed(db, token) == stale
+    db.run_session_maintenance()
+    assert last_accessed(db, token) > stale
+
+    # A recent last_accessed is left alone
+    fresh = last_accessed(db, token)
+    db.invalidate_auth_cache(token=token)
+    assert client.get('/api/validate', headers={'Authorization': token}).status_code == 200
+    db.run_session_maintenance()
+    assert last_accessed(db, token) == fresh
+
+
+def test_sweep_deletes_expired_sessions_in_batches(db, client):
+    live = login(client)
+    conn = db.connect_db()
+    old = ago(db.SESSION_ABSOLUTE_TTL + 60)
+    conn.executemany('INSERT INTO sessions (token, username, created_at, last_accessed) VALUES (?, ?, ?, ?)',
+                     [(f'expired-{n}', 'super_admin', old, ago(0)) for n in range(7)])
+    conn.commit()
+
+    deletes = []
+    conn.set_trace_callback(lambda statement: deletes.append(statement) if 'DELETE FROM sessions' in statement else None)
+    assert db.sweep_expired_sessions(conn, chunk_size=3, pause=0) == 7
+    conn.set_trace_callback(None)
+    # 3 + 3 + 1, each in its own transaction
+    assert len(deletes) == 3
+    assert [row[0] for row in conn.execute('SELECT token FROM sessions')] == [live]
+    conn.close()
@@ -0,0 +1,76 @@
+from conftest import add_shifts, add_team_roster
+
+
+def check_stats(api):
+    conn = api.connect_db()
+    try:
+        return api.check_stats(conn.cursor())
+    finally:
+        conn.close()
+
+
+def test_status_changes_keep_stats_consistent(db, client, auth):
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 3, '2025-10', full_id, half_id)
+    conn.close()
+    assert check_stats(db) == []
+
+    # Upserts that change the status of an existing cell
+    response = client.put('/api/roster/E0000/2025-10-01', headers=auth,
+                          json={'team_id': 1, 'shift': 'N/A', 'status': 'OFF'})
+    assert response.status_code == 200, response.get_json()
+    response = client.patch('/api/roster', headers=auth, json={'team_id': 1, 'changes': [
+        {'emp_id': 'E0001', 'date': '2025-10-02', 'shift': 'Short (2001)', 'status': 'Half Day'},
+        {'emp_id': 'E0002', 'date': '2025-10-07', 'shift': 'Morning (1001)', 'status': 'Full Day'},
+    ]})
+    assert response.status_code == 200, response.get_json()
+    assert check_stats(db) == []
+
+    stats = client.get('/api/stats?team_id=1&month=2025-10', headers=auth).get_json()
+    assert stats['rostered_employees'] == 3
+    # 3 employees x (29 Full Day, 1 Half Day, 1 OFF), then one cell moved each way
+    assert stats['status_counts'] == {'Full Day': 86, 'Half Day': 4, 'OFF': 3, 'Other': 0}
+
+
+def roster_stats_triggers(api):
+    conn = api.connect_db()
+    try:
+        return sorted(row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'roster_stats_%'"))
+    finally:
+        conn.close()
+
+
+def test_bulk_writes_without_triggers_keep_stats_consistent(db, client, auth, monkeypatch):
+    monkeypatch.setattr(db, 'STATS_DEFER_MIN_ROWS', 1)
+    conn = db.connect_db()
+    full_id, half_id = add_shifts(conn)
+    add_team_roster(conn, 1, 3, '2025-10', full_id, half_id)
+    # A teamless legacy cell that the upserts below move into the team
+    conn.execute("UPDATE roster SET team_id = NULL WHERE date = '2025-10-01' AND employee_id = "
+                 "(SELECT id FROM employees WHERE emp_id = 'E0002')")
+    conn.commit()
+    conn.close()
+    triggers = roster_stats_triggers(db)
+    assert len(triggers) == 3
+
+    response = client.post('/api/roster/bulk', headers=auth, json={
+        'month': '2025-10', 'team_id': 1, 'shift_id': half_id,
+        'employees': [{'emp_id': 'E0000', 'off_dates': ['2025-10-01']}, {'emp_id': 'E0002'}],
+    })
+    assert response.status_code == 201, response.get_json()
+    assert check_stats(db) == []
+
+    response = client.post('/api/import?team_id=1', headers={**auth, 'Content-Type': 'text/csv'}, data=(
+        'Employee Name,Employee ID,Date,Shift,Status\n'
+        'New,N1,2025-11-01,Morning (1001),Full Day\n'
+        'Zero,E0001,2025-10-05,N/A,OFF\n'
+    ))
+    assert response.status_code == 200, response.get_json()
+    assert check_stats(db) == []
+    assert roster_stats_triggers(db) == triggers
+
+    stats = client.get('/api/stats?team_id=1&month=2025-10', headers=auth).get_json()
+    assert stats['rostered_employees'] == 4
+    assert stats['status_counts'] == {'Full Day': 89, 'Half Day': 1, 'OFF': 3, 'Other': 0}
@@ -0,0 +1,29 @@
+def open_stream(client, query):
+    response = client.get(f'/api/roster/stream?team_id=1&{query}')
+    status = response.status_code
+    # Closing the streamed body stops the generator and drops the listener
+    response.close()
+    return status
+
+
+def test_stream_rejects_long_lived_token_in_query(db, client, auth):
+    assert open_stream(client, f"token={auth['Authorization']}") == 401
+
+
+def test_stream_ticket_is_single_use(db, client, auth):
+    response = client.post('/api/roster/stream/ticket', headers=auth)
+    assert response.status_code == 200
+    ticket = response.get_json()['ticket']
+
+    assert open_stream(client, f'ticket={ticket}') == 200
+    assert open_stream(client, f'ticket={ticket}') == 401
+
+
+def test_stream_ticket_expires(db, client, auth):
+    assert client.post('/api/roster/stream/ticket').status_code == 401
+    ticket = client.post('/api/roster/stream/ticket', headers=auth).get_json()['ticket']
+    conn = db.connect_db()
+    conn.execute('UPDATE stream_tickets SET expires_at = expires_at - ?', (db.STREAM_TICKET_TTL + 1,))
+    conn.commit()
+    conn.close()
+    assert open_stream(client, f'ticket={ticket}') == 401